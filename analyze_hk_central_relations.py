@@ -5,12 +5,17 @@ import json
 from collections import Counter, defaultdict
 import re
 
+from src.knowledge_graph.storage import NDJSON_SUFFIX, load_ndjson
+
 def load_kg_data(file_path):
     """加载知识图谱数据"""
     print(f"📂 加载知识图谱数据进行香港-中央关系分析...")
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    if file_path.endswith(NDJSON_SUFFIX):
+        data = load_ndjson(file_path)
+    else:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
     
     print(f"✅ 成功加载 {len(data)} 个三元组")
     return data
@@ -292,7 +297,7 @@ def generate_hk_central_summary(hk_central_triples, support_relations, octs_trip
 
 def main():
     """主函数"""
-    file_path = "/Users/adrian/Documents/GitHub/What_kgllm/complete_policy_address_kg.json"
+    file_path = "/Users/adrian/Documents/GitHub/What_kgllm/complete_policy_address_kg.ndjson"
     
     try:
         # 加载数据
@@ -8,6 +8,8 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+from src.knowledge_graph.storage import list_kg_files, load_kg_metadata
+
 def monitor_progress(data_dir="policy_data", check_interval=30):
     """监控知识图谱生成进度"""
     data_path = Path(data_dir)
@@ -23,7 +25,7 @@ def monitor_progress(data_dir="policy_data", check_interval=30):
     try:
         while True:
             # 检查已完成的文件
-            kg_files = list(kg_dir.glob("policy_kg_*.json"))
+            kg_files = list_kg_files(kg_dir, "policy_kg_")
             current_count = len(kg_files)
 
             # 检查错误日志
@@ -42,11 +44,9 @@ def monitor_progress(data_dir="policy_data", check_interval=30):
                 print(f"🎉 新增完成: {current_count - last_count} 个文件")
 
                 # 显示最新完成的文件
-                for kg_file in sorted(kg_files)[-3:]:
+                for kg_file in list(kg_files.values())[-3:]:
                     try:
-                        with open(kg_file, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                        metadata = data.get('metadata', {})
+                        metadata = load_kg_metadata(kg_file)
                         year = metadata.get('year', 'Unknown')
                         triples = metadata.get('total_triples', 0)
                         entities = metadata.get('unique_entities', 0)
@@ -4,7 +4,6 @@
 第二阶段：基于已生成的知识图谱数据进行多维度对比分析
 """
 
-import json
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -14,6 +13,8 @@ from pathlib import Path
 from collections import defaultdict, Counter
 from datetime import datetime
 import warnings
+
+from src.knowledge_graph.storage import list_kg_files, load_kg_metadata, load_kg_triples
 warnings.filterwarnings('ignore')
 
 class PolicyComparativeAnalyzer:
@@ -37,20 +38,16 @@ class PolicyComparativeAnalyzer:
             print(f"❌ 数据目录不存在: {kg_dir}")
             return False
 
-        json_files = list(kg_dir.glob("policy_kg_*.json"))
-        if not json_files:
+        kg_files = list_kg_files(kg_dir, "policy_kg_")
+        if not kg_files:
             print(f"❌ 未找到知识图谱数据文件")
             return False
 
-        for file_path in sorted(json_files):
+        for year, file_path in kg_files.items():
             try:
-                year = int(file_path.stem.split('_')[-1])
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
                 self.kg_data[year] = {
-                    'metadata': data.get('metadata', {}),
-                    'triples': data.get('knowledge_graph', [])
+                    'metadata': load_kg_metadata(file_path),
+                    'triples': load_kg_triples(file_path)
                 }
 
                 print(f"✅ {year}年: {len(self.kg_data[year]['triples'])} 个三元组")
@@ -509,7 +506,7 @@ class PolicyComparativeAnalyzer:
 4. **时序对比**: 识别话语重点的显著变化节点
 
 ## 📊 数据文件
-- 原始数据: `kg_json/policy_kg_YYYY.json`
+- 原始数据: `kg_json/policy_kg_YYYY.ndjson`（元数据: `kg_json/policy_kg_YYYY.meta.json`）
 - 可视化图表: `visualizations/`
 - 详细分析: `analysis/`
 
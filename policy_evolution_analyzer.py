@@ -13,6 +13,8 @@ import seaborn as sns
 from datetime import datetime
 import networkx as nx
 
+from src.knowledge_graph.storage import NDJSON_SUFFIX, load_ndjson
+
 class PolicyEvolutionAnalyzer:
     """施政报告演变分析器"""
     
@@ -56,7 +58,7 @@ for year in {{1997..2024}}; do
     
     input_file="${{BASE_DIR}}/raw_texts/policy_address_${{year}}.txt"
     output_file="${{BASE_DIR}}/kg_outputs/policy_kg_${{year}}.html"
-    json_file="${{BASE_DIR}}/kg_outputs/policy_kg_${{year}}.json"
+    json_file="${{BASE_DIR}}/kg_outputs/policy_kg_${{year}}{NDJSON_SUFFIX}"
     
     if [ -f "$input_file" ]; then
         $KG_GENERATOR --input "$input_file" --output "$output_file"
@@ -83,11 +85,17 @@ echo "🎉 批量处理完成！"
         print("📂 加载历年知识图谱数据...")
         
         for year in self.years:
-            json_file = f"{self.data_dir}/kg_outputs/policy_kg_{year}.json"
+            # generate-graph.py 输出 NDJSON；旧版输出的 .json 列表仍可读取
+            json_file = f"{self.data_dir}/kg_outputs/policy_kg_{year}{NDJSON_SUFFIX}"
+            if not os.path.exists(json_file):
+                json_file = f"{self.data_dir}/kg_outputs/policy_kg_{year}.json"
             if os.path.exists(json_file):
                 try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        self.kg_data[year] = json.load(f)
+                    if json_file.endswith(NDJSON_SUFFIX):
+                        self.kg_data[year] = load_ndjson(json_file)
+                    else:
+                        with open(json_file, 'r', encoding='utf-8') as f:
+                            self.kg_data[year] = json.load(f)
                     print(f"✅ {year}年数据加载成功 ({len(self.kg_data[year])} 个三元组)")
                 except Exception as e:
                     print(f"❌ {year}年数据加载失败: {e}")
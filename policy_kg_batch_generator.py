@@ -17,6 +17,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from src.knowledge_graph.main import process_text_in_chunks
 from src.knowledge_graph.config import load_config
+from src.knowledge_graph.storage import save_kg, list_kg_files, load_kg_metadata
 
 class PolicyKGBatchGenerator:
     """施政报告知识图谱批量生成器 - 改进版"""
@@ -86,19 +87,10 @@ class PolicyKGBatchGenerator:
 
     def get_completed_files(self):
         """获取已完成的文件列表"""
-        completed_years = set()
         kg_dir = self.data_dir / "kg_json"
+        return {year for year in list_kg_files(kg_dir, "policy_kg_") if isinstance(year, int)}
 
-        for kg_file in kg_dir.glob("policy_kg_*.json"):
-            try:
-                year = int(kg_file.stem.split('_')[-1])
-                completed_years.add(year)
-            except ValueError:
-                continue
-
-        return completed_years
-
-    def generate_single_kg(self, year, text_content, config):
+    def generate_single_kg(self, year, text_content, config, chunk_cache=None):
         """为单年施政报告生成知识图谱"""
         print(f"\n📄 处理 {year} 年施政报告...")
         print(f"   文本长度: {len(text_content):,} 字符")
@@ -107,7 +99,7 @@ class PolicyKGBatchGenerator:
             start_time = time.time()
 
             # 处理文本生成知识图谱
-            kg_data = process_text_in_chunks(config, text_content, debug=False)
+            kg_data = process_text_in_chunks(config, text_content, debug=False, chunk_cache=chunk_cache)
 
             if not kg_data:
                 print(f"❌ {year}年知识图谱生成失败 - 无数据返回")
@@ -127,21 +119,15 @@ class PolicyKGBatchGenerator:
                 'chunks_processed': max([item.get('chunk', 1) for item in kg_data]) if kg_data else 0
             }
 
-            # 保存JSON数据
-            json_file = self.data_dir / "kg_json" / f"policy_kg_{year}.json"
-            output_data = {
-                'metadata': metadata,
-                'knowledge_graph': kg_data
-            }
-
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, ensure_ascii=False, indent=2)
+            # 保存数据：三元组逐行写入NDJSON，元数据写入 .meta.json
+            kg_file = save_kg(self.data_dir / "kg_json" / f"policy_kg_{year}", kg_data, metadata)
 
             print(f"✅ {year}年处理完成 (耗时: {processing_time:.1f}秒):")
             print(f"   • 三元组数量: {metadata['total_triples']}")
             print(f"   • 唯一实体: {metadata['unique_entities']}")
             print(f"   • 关系类型: {metadata['unique_relations']}")
             print(f"   • 处理块数: {metadata['chunks_processed']}")
+            print(f"   • 数据保存: {kg_file}")
 
             return metadata
 
@@ -213,6 +199,7 @@ class PolicyKGBatchGenerator:
 
         # 分批处理
         results = {}
+        chunk_cache = {}  # 跨年份共享，相同文本块只调用一次LLM
         total_batches = (len(pending_files) + self.batch_size - 1) // self.batch_size
 
         for batch_idx in range(total_batches):
@@ -231,7 +218,7 @@ class PolicyKGBatchGenerator:
                         text_content = f.read()
 
                     # 生成知识图谱
-                    metadata = self.generate_single_kg(year, text_content, config)
+                    metadata = self.generate_single_kg(year, text_content, config, chunk_cache)
                     if metadata:
                         results[year] = metadata
 
@@ -263,16 +250,24 @@ class PolicyKGBatchGenerator:
         if not results:
             return
 
+        total_triples = total_entities = 0
+        total_time = 0
+        for r in results.values():
+            total_triples += r['total_triples']
+            total_entities += r['unique_entities']
+            total_time += r.get('processing_time_seconds', 0)
+        n = len(results)
+
         summary = {
             'generated_at': datetime.now().isoformat(),
-            'batch_size': len(results),
-            'years_processed': sorted(results.keys()),
+            'batch_size': n,
+            'years_processed': sorted(results),
             'summary_stats': {
-                'total_triples': sum(r['total_triples'] for r in results.values()),
-                'avg_triples_per_year': sum(r['total_triples'] for r in results.values()) / len(results),
-                'total_entities': sum(r['unique_entities'] for r in results.values()),
-                'avg_entities_per_year': sum(r['unique_entities'] for r in results.values()) / len(results),
-                'total_processing_time': sum(r.get('processing_time_seconds', 0) for r in results.values())
+                'total_triples': total_triples,
+                'avg_triples_per_year': total_triples / n,
+                'total_entities': total_entities,
+                'avg_entities_per_year': total_entities / n,
+                'total_processing_time': total_time
             },
             'yearly_details': results
         }
@@ -290,7 +285,7 @@ class PolicyKGBatchGenerator:
         print("=" * 50)
 
         kg_dir = self.data_dir / "kg_json"
-        existing_files = list(kg_dir.glob("policy_kg_*.json"))
+        existing_files = list_kg_files(kg_dir, "policy_kg_")
 
         if not existing_files:
             print("❌ 未找到任何知识图谱数据文件")
@@ -300,13 +295,9 @@ class PolicyKGBatchGenerator:
         total_triples = 0
         total_entities = 0
 
-        for file_path in sorted(existing_files):
+        for year, file_path in existing_files.items():
             try:
-                year = int(file_path.stem.split('_')[-1])
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                metadata = data.get('metadata', {})
+                metadata = load_kg_metadata(file_path)
                 triples = metadata.get('total_triples', 0)
                 entities = metadata.get('unique_entities', 0)
                 relations = metadata.get('unique_relations', 0)
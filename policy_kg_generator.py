@@ -16,6 +16,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from src.knowledge_graph.main import process_text_in_chunks
 from src.knowledge_graph.config import load_config
+from src.knowledge_graph.storage import save_kg, list_kg_files, load_kg_metadata
 
 class PolicyKGGenerator:
     """施政报告知识图谱生成器"""
@@ -72,13 +73,13 @@ class PolicyKGGenerator:
 
         return policy_config
 
-    def generate_single_kg(self, year, text_content, config):
+    def generate_single_kg(self, year, text_content, config, chunk_cache=None):
         """为单年施政报告生成知识图谱"""
         print(f"\n📄 处理 {year} 年施政报告...")
 
         try:
             # 处理文本生成知识图谱
-            kg_data = process_text_in_chunks(config, text_content, debug=False)
+            kg_data = process_text_in_chunks(config, text_content, debug=False, chunk_cache=chunk_cache)
 
             if not kg_data:
                 print(f"❌ {year}年知识图谱生成失败")
@@ -95,21 +96,14 @@ class PolicyKGGenerator:
                 'chunks_processed': max([item.get('chunk', 1) for item in kg_data])
             }
 
-            # 保存JSON数据
-            json_file = self.data_dir / "kg_json" / f"policy_kg_{year}.json"
-            output_data = {
-                'metadata': metadata,
-                'knowledge_graph': kg_data
-            }
-
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, ensure_ascii=False, indent=2)
+            # 保存数据：三元组逐行写入NDJSON，元数据写入 .meta.json
+            kg_file = save_kg(self.data_dir / "kg_json" / f"policy_kg_{year}", kg_data, metadata)
 
             print(f"✅ {year}年处理完成:")
             print(f"   • 三元组数量: {metadata['total_triples']}")
             print(f"   • 唯一实体: {metadata['unique_entities']}")
             print(f"   • 关系类型: {metadata['unique_relations']}")
-            print(f"   • 数据保存: {json_file}")
+            print(f"   • 数据保存: {kg_file}")
 
             return metadata
 
@@ -132,6 +126,7 @@ class PolicyKGGenerator:
 
         config = self.create_policy_config()
         results = {}
+        chunk_cache = {}  # 跨年份共享，相同文本块只调用一次LLM
 
         # 检查可用的文本文件
         available_files = []
@@ -160,7 +155,7 @@ class PolicyKGGenerator:
                     text_content = f.read()
 
                 # 生成知识图谱
-                metadata = self.generate_single_kg(year, text_content, config)
+                metadata = self.generate_single_kg(year, text_content, config, chunk_cache)
                 if metadata:
                     results[year] = metadata
 
@@ -184,15 +179,21 @@ class PolicyKGGenerator:
 
     def _save_batch_results(self, results):
         """保存批量处理结果摘要"""
+        total_triples = total_entities = 0
+        for r in results.values():
+            total_triples += r['total_triples']
+            total_entities += r['unique_entities']
+        n = len(results) or 1
+
         summary = {
             'generated_at': datetime.now().isoformat(),
             'total_years': len(results),
-            'years_processed': sorted(results.keys()),
+            'years_processed': sorted(results),
             'summary_stats': {
-                'total_triples': sum(r['total_triples'] for r in results.values()),
-                'avg_triples_per_year': sum(r['total_triples'] for r in results.values()) / len(results) if results else 0,
-                'total_entities': sum(r['unique_entities'] for r in results.values()),
-                'avg_entities_per_year': sum(r['unique_entities'] for r in results.values()) / len(results) if results else 0
+                'total_triples': total_triples,
+                'avg_triples_per_year': total_triples / n,
+                'total_entities': total_entities,
+                'avg_entities_per_year': total_entities / n
             },
             'yearly_details': results
         }
@@ -209,20 +210,16 @@ class PolicyKGGenerator:
         print("=" * 50)
 
         kg_dir = self.data_dir / "kg_json"
-        existing_files = list(kg_dir.glob("policy_kg_*.json"))
+        existing_files = list_kg_files(kg_dir, "policy_kg_")
 
         if not existing_files:
             print("❌ 未找到任何知识图谱数据文件")
             return {}
 
         data_status = {}
-        for file_path in sorted(existing_files):
+        for year, file_path in existing_files.items():
             try:
-                year = int(file_path.stem.split('_')[-1])
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                metadata = data.get('metadata', {})
+                metadata = load_kg_metadata(file_path)
                 data_status[year] = {
                     'file': file_path,
                     'triples': metadata.get('total_triples', 0),
@@ -5,7 +5,7 @@ A tool that takes text input and generates an interactive knowledge graph visual
 """
 
 from .visualization import visualize_knowledge_graph, sample_data_visualization
-from .llm import call_llm, extract_json_from_text
+from .llm import call_llm, extract_json_from_text, iter_json_array
 from .config import load_config
 
 __version__ = "0.1.0"
@@ -0,0 +1,59 @@
+"""Persistent cache for LLM extraction results."""
+import hashlib
+import json
+import os
+import sqlite3
+
+DEFAULT_CACHE_PATH = ".kgcache/llm_results.sqlite"
+
+class ResultCache:
+    """SQLite-backed key/value store for JSON-serialisable LLM results."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    @staticmethod
+    def make_key(*parts):
+        """Build a cache key from the given parts (e.g. model, prompt version, input text)."""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is not cached."""
+        row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        """Store a JSON-serialisable value under key."""
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                               (key, json.dumps(value, ensure_ascii=False)))
+
+_caches = {}
+
+def get_cache(config):
+    """
+    Get the result cache configured in the ``[cache]`` section.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        A shared ResultCache instance, or None if caching is disabled
+    """
+    cache_config = config.get("cache", {})
+    if not cache_config.get("enabled", False):
+        return None
+    path = os.path.abspath(cache_config.get("path", DEFAULT_CACHE_PATH))
+    if path not in _caches:
+        _caches[path] = ResultCache(path)
+    return _caches[path]
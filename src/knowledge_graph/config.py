@@ -1,20 +1,32 @@
 """Configuration utilities for the knowledge graph generator."""
+import copy
 import tomli
 import os
+from functools import lru_cache
+
+@lru_cache(maxsize=4)
+def _parse_config(config_path, mtime_ns):
+    """Parse a TOML file; cached per path and modification time."""
+    with open(config_path, "rb") as f:
+        return tomli.load(f)
 
 def load_config(config_file="config.toml"):
     """
     Load configuration from TOML file.
-    
+
+    The parsed file is cached, so repeated calls only re-read it after it changes.
+    Each call returns a fresh copy that callers are free to modify.
+
     Args:
         config_file: Path to the TOML configuration file
-        
+
     Returns:
         Dictionary containing the configuration or None if loading fails
     """
     try:
-        with open(config_file, "rb") as f:
-            return tomli.load(f)
+        config_path = os.path.abspath(config_file)
+        config = _parse_config(config_path, os.stat(config_path).st_mtime_ns)
+        return copy.deepcopy(config)
     except Exception as e:
         print(f"Error loading config file: {e}")
-        return None 
\ No newline at end of file
+        return None
@@ -3,7 +3,13 @@ import requests
 import json
 import re
 
-def call_llm(model, user_prompt, api_key, system_prompt=None, max_tokens=1000, temperature=1.0, base_url=None) -> str:
+# 模块级会话：在多次调用（以及并发的工作线程）之间复用 TCP/TLS 连接
+_session = requests.Session()
+_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+_session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+def call_llm(model, user_prompt, api_key, system_prompt=None, max_tokens=1000, temperature=1.0, base_url=None,
+             prompt_cache_key=None) -> str:
     """
     调用语言模型 API。
     
@@ -15,6 +21,7 @@ def call_llm(model, user_prompt, api_key, system_prompt=None, max_tokens=1000, t
         max_tokens: 最大生成令牌数
         temperature: 采样温度
         base_url: API 端点的基础 URL
+        prompt_cache_key: 可选的提示缓存键，支持前缀缓存的服务端据此把共享相同前缀的请求路由到一起
         
     Returns:
         模型的响应字符串
@@ -56,13 +63,15 @@ def call_llm(model, user_prompt, api_key, system_prompt=None, max_tokens=1000, t
         'temperature': temperature,
         'stream': False  # 关闭流式输出以简化处理
     }
+    if prompt_cache_key:
+        payload['prompt_cache_key'] = prompt_cache_key
     
     try:
         print(f"正在调用LLM API: {base_url}")
         print(f"使用模型: {model}")
         print(f"Authorization: Bearer {api_key[:10]}...")  # 显示Bearer格式
 
-        response = requests.post(
+        response = _session.post(
             base_url,
             headers=headers,
             json=payload,
@@ -106,6 +115,37 @@ def call_llm(model, user_prompt, api_key, system_prompt=None, max_tokens=1000, t
         print(f"❌ 调用API时出错: {str(e)}")
         return None
 
+_json_decoder = json.JSONDecoder()
+_separator_pattern = re.compile(r'[\s,]*')
+
+def iter_json_array(text):
+    """
+    Lazily yield the elements of the first JSON array in text, one at a time.
+    
+    Elements are decoded individually, so a truncated response still yields
+    every complete element before the cut-off. Iteration stops silently at the
+    first element that cannot be decoded.
+    
+    Args:
+        text: Text that may contain a JSON array
+        
+    Yields:
+        Decoded array elements
+    """
+    start_idx = text.find('[')
+    if start_idx == -1:
+        return
+    idx = start_idx + 1
+    while True:
+        idx = _separator_pattern.match(text, idx).end()
+        if idx >= len(text) or text[idx] == ']':
+            return
+        try:
+            element, idx = _json_decoder.raw_decode(text, idx)
+        except json.JSONDecodeError:
+            return
+        yield element
+
 def extract_json_from_text(text):
     """
     Extract JSON array from text that might contain additional content.
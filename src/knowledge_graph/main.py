@@ -2,19 +2,129 @@
 Knowledge Graph Generator and Visualizer main module.
 """
 import argparse
-import json
+import asyncio
+import hashlib
+import multiprocessing
 import os
 import sys
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Add the parent directory to the Python path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.knowledge_graph.config import load_config
-from src.knowledge_graph.llm import call_llm, extract_json_from_text
+from src.knowledge_graph.cache import get_cache
+from src.knowledge_graph.llm import call_llm, extract_json_from_text, iter_json_array
 from src.knowledge_graph.visualization import visualize_knowledge_graph, sample_data_visualization
-from src.knowledge_graph.text_utils import chunk_text
+from src.knowledge_graph.text_utils import chunk_text_with_counts, get_token_counter
+from src.knowledge_graph.storage import NDJSON_SUFFIX, write_ndjson
 from src.knowledge_graph.entity_standardization import standardize_entities, infer_relationships, limit_predicate_length
-from src.knowledge_graph.prompts import MAIN_SYSTEM_PROMPT, MAIN_USER_PROMPT
+from src.knowledge_graph.prompts import (
+    MAIN_SYSTEM_PROMPT,
+    MAIN_USER_PROMPT,
+    CHUNK_EXTRACTION_SYSTEM_PROMPT,
+    CHUNK_EXTRACTION_USER_PROMPT_HEAD,
+    get_batch_extraction_user_prompt
+)
+
+# 提取提示的版本号，修改提取提示后需递增，使结果缓存失效
+_EXTRACTION_PROMPT_VERSION = 2
+
+def _validate_triples(triples):
+    """保留包含subject、predicate、object的三元组，并规范为去除首尾空白的字符串"""
+    triples = list(triples)
+    try:
+        # 快速路径：LLM通常返回格式完全正确的三元组
+        return [{
+            'subject': triple['subject'].strip(),
+            'predicate': triple['predicate'].strip(),
+            'object': triple['object'].strip()
+        } for triple in triples]
+    except (KeyError, AttributeError, TypeError):
+        pass
+    
+    # 逐个验证，跳过格式不正确的三元组
+    valid_triples = []
+    for triple in triples:
+        if isinstance(triple, dict) and 'subject' in triple and 'predicate' in triple and 'object' in triple:
+            valid_triples.append({
+                'subject': str(triple['subject']).strip(),
+                'predicate': str(triple['predicate']).strip(),
+                'object': str(triple['object']).strip()
+            })
+    return valid_triples
+
+def request_extraction(config, input_text, debug=False):
+    """
+    向LLM发送单个文本块的提取请求。
+    
+    Args:
+        config: 配置字典
+        input_text: 要分析的文本
+        debug: 如果为True，打印详细调试信息
+        
+    Returns:
+        LLM的原始响应文本，如果调用失败则返回None
+    """
+    # 使用专门的知识图谱提取提示；固定前缀在前、文本在末尾，便于服务端复用前缀缓存
+    system_prompt = CHUNK_EXTRACTION_SYSTEM_PROMPT
+    user_prompt = CHUNK_EXTRACTION_USER_PROMPT_HEAD + input_text
+
+    # LLM配置
+    model = config["llm"]["model"]
+    api_key = config["llm"]["api_key"]
+    max_tokens = config["llm"]["max_tokens"]
+    temperature = config["llm"]["temperature"]
+    base_url = config["llm"]["base_url"]
+    prompt_cache_key = config["llm"].get("prompt_cache_key")
+    
+    if debug:
+        print(f"发送给LLM的提示:\n{user_prompt[:200]}...")
+
+    # 处理文本
+    response = call_llm(model, user_prompt, api_key, system_prompt, max_tokens, temperature, base_url,
+                        prompt_cache_key=prompt_cache_key)
+    
+    if response is None:
+        print("LLM API调用失败")
+        return None
+    
+    if debug:
+        print(f"LLM原始响应:\n{response}")
+    return response
+
+def parse_extraction_response(response, debug=False):
+    """
+    从LLM响应中解析并验证三元组。该函数不依赖全局状态，可以在子进程中执行。
+    
+    Args:
+        response: LLM的原始响应文本
+        debug: 如果为True，打印详细调试信息
+        
+    Returns:
+        提取的三元组列表，如果无法解析则返回None
+    """
+    # 逐个解析JSON数组元素并同时验证三元组格式
+    valid_triples = _validate_triples(iter_json_array(response))
+    
+    if not valid_triples:
+        # 响应不是干净的JSON数组时，退回到通用的JSON提取
+        triples = extract_json_from_text(response)
+        
+        if triples is None:
+            print("无法从LLM响应中提取JSON")
+            return None
+        
+        valid_triples = _validate_triples(triples)
+
+    if debug:
+        print(f"提取的有效三元组数量: {len(valid_triples)}")
+        for i, triple in enumerate(valid_triples[:5]):  # 只显示前5个
+            print(f"  {i+1}. {triple}")
+
+    return valid_triples
 
 def process_with_llm(config, input_text, debug=False):
     """
@@ -29,74 +139,216 @@ def process_with_llm(config, input_text, debug=False):
         提取的三元组列表，如果处理失败则返回None
     """
     try:
-        # 使用专门的知识图谱提取提示
-        system_prompt = "你是一个专业的知识图谱构建助手。请从文本中提取实体和关系，并以JSON格式返回。"
+        response = request_extraction(config, input_text, debug)
+        if response is None:
+            return None
+        return parse_extraction_response(response, debug)
+    except Exception as e:
+        print(f"处理文本时出错: {str(e)}")
+        return None
 
-        user_prompt = f"""
-        请从以下文本中提取实体和关系，并以JSON格式返回：
+def process_chunk_batch(config, chunks, debug=False):
+    """
+    在一次LLM调用中处理多个文本块，摊薄每次请求的固定开销。
+    
+    Args:
+        config: 配置字典
+        chunks: 文本块列表
+        debug: 如果为True，打印详细调试信息
+        
+    Returns:
+        (results, ok) 元组：results 为每个文本块对应的三元组列表（失败为None）；
+        ok 表示批量响应是否完整可用。响应无法解析或缺少某些块时，
+        这些块会退回到逐块调用 process_with_llm。
+    """
+    if len(chunks) == 1:
+        return [process_with_llm(config, chunks[0], debug)], True
 
-        文本：{input_text}
+    user_prompt = get_batch_extraction_user_prompt(chunks)
 
-        请返回JSON数组格式，每个元素包含subject（主体）、predicate（关系）、object（客体）：
-        [
-            {{"subject": "实体1", "predicate": "关系", "object": "实体2"}},
-            {{"subject": "实体3", "predicate": "关系", "object": "实体4"}}
-        ]
+    llm_config = config["llm"]
+    response = call_llm(llm_config["model"], user_prompt, llm_config["api_key"], CHUNK_EXTRACTION_SYSTEM_PROMPT,
+                        llm_config["max_tokens"], llm_config["temperature"], llm_config["base_url"],
+                        prompt_cache_key=llm_config.get("prompt_cache_key"))
 
-        要求：
-        1. 关系词（predicate）最多3个字
-        2. 只返回JSON数组，不要其他内容
-        3. 确保JSON格式正确
+    results = [None] * len(chunks)
+    entries = None
+    if response:
+        entries = list(iter_json_array(response)) or extract_json_from_text(response)
+    if debug:
+        print(f"LLM原始响应:\n{response}")
+    for entry in entries or []:
+        if not isinstance(entry, dict) or not isinstance(entry.get('triples'), list):
+            continue
+        try:
+            index = int(entry.get('chunk')) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < len(chunks):
+            results[index] = _validate_triples(entry['triples'])
+
+    ok = all(result is not None for result in results)
+    if not ok:
+        print(f"批量响应不完整，{results.count(None)}/{len(chunks)} 个文本块改为逐块处理")
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = process_with_llm(config, chunks[i], debug)
+    return results, ok
+
+async def process_with_llm_async(config, input_text, debug=False):
+    """
+    process_with_llm 的异步版本，在工作线程中执行阻塞的HTTP调用，
+    以便多个文本块的LLM请求可以并发进行。
+    """
+    return await asyncio.to_thread(process_with_llm, config, input_text, debug)
+
+def _run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+    
+    asyncio.run cannot be used while an event loop is already running in this thread
+    (e.g. in Jupyter or when called from an async application), so the coroutine then
+    runs on its own loop in a worker thread.
     """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+def _chunk_key(chunk):
+    """Content hash used to recognise identical chunks (e.g. boilerplate shared across years)."""
+    return hashlib.sha256(chunk.strip().encode('utf-8')).hexdigest()
 
-        # LLM配置
+async def _extract_chunks(config, text_chunks, debug=False, chunk_cache=None, skip=()):
+    """
+    Extract triples from all chunks (``Chunk`` tuples) concurrently, at most ``llm.concurrency``
+    requests in flight. Identical chunks are only sent to the LLM once, and
+    results persisted by an enabled ``[cache]`` are reused across runs.
+    Chunks whose indices are in ``skip`` are not extracted (progress output keeps
+    numbering the chunks by their position in ``text_chunks``).
+    
+    Returns:
+        One list of triples (or None on failure or when skipped) per chunk, in chunk order
+    """
+    if chunk_cache is None:
+        chunk_cache = {}
+    
+    keys = [_chunk_key(chunk.text) for chunk in text_chunks]
+    unique = {}
+    for i, (key, chunk) in enumerate(zip(keys, text_chunks)):
+        if i not in skip and key not in chunk_cache and key not in unique:
+            unique[key] = chunk
+    if len(unique) < len(text_chunks) - len(skip):
+        print(f"Reusing triples for {len(text_chunks) - len(skip) - len(unique)} duplicate chunks")
+    
+    # Look up chunks extracted in earlier runs
+    result_cache = get_cache(config)
+    cache_keys = {}
+    if result_cache is not None:
         model = config["llm"]["model"]
-        api_key = config["llm"]["api_key"]
-        max_tokens = config["llm"]["max_tokens"]
-        temperature = config["llm"]["temperature"]
-        base_url = config["llm"]["base_url"]
+        for key, chunk in list(unique.items()):
+            cache_keys[key] = result_cache.make_key(model, _EXTRACTION_PROMPT_VERSION, chunk.text.strip())
+            cached = result_cache.get(cache_keys[key])
+            if cached is not None:
+                chunk_cache[key] = cached
+                del unique[key]
+        if len(unique) < len(cache_keys):
+            print(f"Loaded {len(cache_keys) - len(unique)} chunks from the result cache")
+    
+    workers = max(1, config.get("llm", {}).get("concurrency", 8))
+    batch_size = config.get("chunking", {}).get("batch_size", 1)
+    if batch_size > 1:
+        results = await _extract_batched(config, [(key, chunk.text) for key, chunk in unique.items()], batch_size, workers, debug)
+    else:
+        semaphore = asyncio.Semaphore(workers)
+        position = {key: i for i, key in reversed(list(enumerate(keys))) if i not in skip}
         
-        if debug:
-            print(f"发送给LLM的提示:\n{user_prompt[:200]}...")
-
-        # 处理文本
-        response = call_llm(model, user_prompt, api_key, system_prompt, max_tokens, temperature, base_url)
+        # Optionally move JSON parsing/validation off the GIL into worker processes
+        parse_workers = config.get("llm", {}).get("parse_workers", 0)
+        # The request threads are already running here, so the workers are spawned rather than
+        # forked: a child forked while another thread holds a lock (e.g. stdout's) can deadlock
+        parse_pool = None
+        if parse_workers > 0 and unique:
+            parse_pool = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn"))
+        loop = asyncio.get_running_loop()
         
-        if response is None:
-            print("LLM API调用失败")
-            return None
+        async def extract(key, chunk):
+            async with semaphore:
+                print(f"Processing chunk {position[key]+1}/{len(text_chunks)} ({chunk.word_count} words)")
+                if parse_pool is None:
+                    return await process_with_llm_async(config, chunk.text, debug)
+                response = await asyncio.to_thread(request_extraction, config, chunk.text, debug)
+            if response is None:
+                return None
+            return await loop.run_in_executor(parse_pool, parse_extraction_response, response, debug)
         
-        if debug:
-            print(f"LLM原始响应:\n{response}")
-            
-        # 从响应中提取JSON
-        triples = extract_json_from_text(response)
-            
-        if triples is None:
-            print("无法从LLM响应中提取JSON")
-            return None
-            
-        # 验证提取的三元组格式
-        valid_triples = []
-        for triple in triples:
-            if isinstance(triple, dict) and 'subject' in triple and 'predicate' in triple and 'object' in triple:
-                valid_triples.append({
-                    'subject': str(triple['subject']).strip(),
-                    'predicate': str(triple['predicate']).strip(),
-                    'object': str(triple['object']).strip()
-                })
+        try:
+            outcomes = await asyncio.gather(*(extract(key, chunk) for key, chunk in unique.items()), return_exceptions=True)
+        finally:
+            if parse_pool is not None:
+                parse_pool.shutdown()
+        results = {}
+        for key, outcome in zip(unique, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"处理文本块时出错: {str(outcome)}")
+            else:
+                results[key] = outcome
+    
+    for key, result in results.items():
+        if result:
+            chunk_cache[key] = result
+            if result_cache is not None:
+                result_cache.set(cache_keys[key], result)
+    
+    # Hand out copies so callers can annotate triples without touching the cache
+    return [[dict(item) for item in chunk_cache[key]] if key in chunk_cache and i not in skip else None
+            for i, key in enumerate(keys)]
 
-        if debug:
-            print(f"提取的有效三元组数量: {len(valid_triples)}")
-            for i, triple in enumerate(valid_triples[:5]):  # 只显示前5个
-                print(f"  {i+1}. {triple}")
+async def _extract_batched(config, items, batch_size, workers, debug=False):
+    """
+    Extract triples for (key, chunk) pairs, packing up to ``batch_size`` chunks
+    into each LLM call with ``workers`` calls in flight. The batch size is
+    halved whenever a batched response comes back incomplete (typically
+    because it ran into ``max_tokens``).
+    
+    Returns:
+        Dict mapping each key to its triples (or None on failure)
+    """
+    queue = deque(items)
+    results = {}
+    state = {"batch_size": batch_size}
+    total = len(items)
+    
+    async def worker():
+        while queue:
+            batch = [queue.popleft() for _ in range(min(state["batch_size"], len(queue)))]
+            print(f"Processing {len(batch)} chunks in one request ({total - len(queue)}/{total})")
+            try:
+                batch_results, ok = await asyncio.to_thread(process_chunk_batch, config, [chunk for _, chunk in batch], debug)
+            except Exception as e:
+                print(f"处理文本块时出错: {str(e)}")
+                batch_results, ok = [None] * len(batch), False
+            for (key, _), result in zip(batch, batch_results):
+                results[key] = result
+            if not ok and state["batch_size"] > len(batch) // 2:
+                state["batch_size"] = max(1, len(batch) // 2)
+                print(f"Reducing chunk batch size to {state['batch_size']}")
+    
+    await asyncio.gather(*(worker() for _ in range(min(workers, total))))
+    return results
 
-        return valid_triples
-    except Exception as e:
-        print(f"处理文本时出错: {str(e)}")
-        return None
+def _covered_by_neighbours(full_text, chunk, before, after):
+    """Whether all non-whitespace text of chunk also lies in the chunk before or after it (either may be None)."""
+    start, end = chunk.start, chunk.end
+    if before is not None and before.start <= start:
+        start = max(start, before.end)
+    if after is not None and after.end >= end:
+        end = min(end, max(start, after.start))
+    return not full_text[start:end].strip()
 
-def process_text_in_chunks(config, full_text, debug=False):
+def process_text_in_chunks(config, full_text, debug=False, chunk_cache=None):
     """
     Process a large text by breaking it into chunks with overlap,
     and then processing each chunk separately.
@@ -105,6 +357,9 @@ def process_text_in_chunks(config, full_text, debug=False):
         config: Configuration dictionary
         full_text: The complete text to process
         debug: If True, print detailed debug information
+        chunk_cache: Optional dict mapping chunk content hashes to extracted triples.
+                     Pass the same dict across calls (e.g. one per batch run) so that
+                     identical chunks are only sent to the LLM once.
     
     Returns:
         List of all extracted triples from all chunks
@@ -112,22 +367,52 @@ def process_text_in_chunks(config, full_text, debug=False):
     # Get chunking parameters from config
     chunk_size = config.get("chunking", {}).get("chunk_size", 500)
     overlap = config.get("chunking", {}).get("overlap", 50)
+    min_chunk_words = config.get("chunking", {}).get("min_chunk_words", 30)
+    chunk_tokens = config.get("chunking", {}).get("chunk_tokens")
+    
+    # Size chunks by the model's tokenizer when a token budget is configured,
+    # otherwise fall back to the word-based chunk_size
+    token_counter = None
+    unit = "words"
+    if chunk_tokens:
+        token_counter = get_token_counter(config.get("llm", {}).get("model"))
+        if token_counter:
+            chunk_size = chunk_tokens
+            unit = "tokens"
+        else:
+            print("tiktoken is not installed; falling back to word-based chunk_size")
     
     # Split text into chunks
-    text_chunks = chunk_text(full_text, chunk_size, overlap)
+    text_chunks = chunk_text_with_counts(full_text, chunk_size, overlap, length_fn=token_counter)
     
     print("=" * 50)
     print("PHASE 1: INITIAL TRIPLE EXTRACTION")
     print("=" * 50)
-    print(f"Processing text in {len(text_chunks)} chunks (size: {chunk_size} words, overlap: {overlap} words)")
+    print(f"Processing text in {len(text_chunks)} chunks (size: {chunk_size} {unit}, overlap: {overlap} words)")
     
-    # Process each chunk
-    all_results = []
+    # Skip short chunks (e.g. overlap tails) rather than spending an LLM call on them, but only
+    # when their text is fully contained in the neighbouring chunks; the threshold never
+    # exceeds half a chunk, so normal-sized chunks of a small chunk_size are kept
+    min_chunk_words = min(min_chunk_words, chunk_size // 2)
+    skip = set()
+    previous = None  # Last chunk that is extracted
     for i, chunk in enumerate(text_chunks):
-        print(f"Processing chunk {i+1}/{len(text_chunks)} ({len(chunk.split())} words)")
-        
-        # Process the chunk with LLM
-        chunk_results = process_with_llm(config, chunk, debug)
+        following = text_chunks[i + 1] if i + 1 < len(text_chunks) else None
+        if (len(text_chunks) > 1 and chunk.word_count < min_chunk_words
+                and _covered_by_neighbours(full_text, chunk, previous, following)):
+            skip.add(i)
+        else:
+            previous = chunk
+    if skip:
+        print(f"Skipping {len(skip)} chunks shorter than {min_chunk_words} words already covered by their neighbours")
+    
+    # Process all chunks concurrently
+    chunk_results_list = _run_sync(_extract_chunks(config, text_chunks, debug, chunk_cache, skip))
+    
+    all_results = []
+    for i, chunk_results in enumerate(chunk_results_list):
+        if i in skip:
+            continue
         if chunk_results:
             # Add chunk information to each triple
             for item in chunk_results:
@@ -159,23 +444,19 @@ def process_text_in_chunks(config, full_text, debug=False):
         print(f"Starting with {len(all_results)} triples")
         
         # Count existing relationships
-        relationship_counts = {}
-        for triple in all_results:
-            relationship_counts[triple["predicate"]] = relationship_counts.get(triple["predicate"], 0) + 1
+        relationship_counts = Counter(triple["predicate"] for triple in all_results)
         
         print("Top 5 relationship types before inference:")
-        for pred, count in sorted(relationship_counts.items(), key=lambda x: x[1], reverse=True)[:5]:
+        for pred, count in relationship_counts.most_common(5):
             print(f"  - {pred}: {count} occurrences")
         
         all_results = infer_relationships(all_results, config)
         
         # Count relationships after inference
-        relationship_counts_after = {}
-        for triple in all_results:
-            relationship_counts_after[triple["predicate"]] = relationship_counts_after.get(triple["predicate"], 0) + 1
+        relationship_counts_after = Counter(triple["predicate"] for triple in all_results)
         
         print("\nTop 5 relationship types after inference:")
-        for pred, count in sorted(relationship_counts_after.items(), key=lambda x: x[1], reverse=True)[:5]:
+        for pred, count in relationship_counts_after.most_common(5):
             print(f"  - {pred}: {count} occurrences")
         
         # Count inferred relationships
@@ -196,13 +477,11 @@ def get_unique_entities(triples):
         Set of unique entity names
     """
     entities = set()
+    update = entities.update
     for triple in triples:
-        if not isinstance(triple, dict):
-            continue
-        if "subject" in triple:
-            entities.add(triple["subject"])
-        if "object" in triple:
-            entities.add(triple["object"])
+        if isinstance(triple, dict):
+            update((triple.get("subject"), triple.get("object")))
+    entities.discard(None)
     return entities
 
 def create_knowledge_graph(text, title="Knowledge Graph", debug=False):
@@ -221,12 +500,11 @@ def create_knowledge_graph(text, title="Knowledge Graph", debug=False):
     config = load_config()
     
     # Process text chunks
-    chunks = chunk_text(text, max_length=2000)
+    chunks = chunk_text_with_counts(text, max_length=2000)
     all_triples = []
     
-    for chunk in chunks:
-        # Process each chunk with LLM
-        chunk_triples = process_with_llm(config, chunk, debug=debug)
+    # Process all chunks with LLM concurrently
+    for chunk_triples in _run_sync(_extract_chunks(config, chunks, debug)):
         if chunk_triples:
             all_triples.extend(chunk_triples)
     
@@ -298,17 +576,25 @@ def main():
     result = process_text_in_chunks(config, input_text, args.debug)
     
     if result:
-        # Save the raw data as JSON for potential reuse
-        json_output = args.output.replace('.html', '.json')
-        try:
-            with open(json_output, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2)
-            print(f"Saved raw knowledge graph data to {json_output}")
-        except Exception as e:
-            print(f"Warning: Could not save raw data to {json_output}: {e}")
+        # Save the raw data as NDJSON (one triple per line) for potential reuse,
+        # in the background while the visualization is being built
+        json_output = os.path.splitext(args.output)[0] + NDJSON_SUFFIX
+        
+        def save_raw_data():
+            try:
+                write_ndjson(json_output, result)
+                print(f"Saved raw knowledge graph data to {json_output}")
+            except Exception as e:
+                print(f"Warning: Could not save raw data to {json_output}: {e}")
+        
+        writer = threading.Thread(target=save_raw_data)
+        writer.start()
         
         # Visualize the knowledge graph
-        stats = visualize_knowledge_graph(result, args.output, config=config)
+        try:
+            stats = visualize_knowledge_graph(result, args.output, config=config)
+        finally:
+            writer.join()
         print("\nKnowledge Graph Statistics:")
         print(f"Nodes: {stats['nodes']}")
         print(f"Edges: {stats['edges']}")
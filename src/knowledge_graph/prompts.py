@@ -72,6 +72,48 @@ Important: Only output the JSON array (with the S-P-O objects) and nothing else
 Text to analyze (between triple backticks):
 """
 
+# Phase 1: Chunk extraction prompts used by process_with_llm / process_chunk_batch.
+# The variable chunk text is always appended at the very end, so every request
+# shares a byte-identical prefix that providers with prompt caching can reuse.
+CHUNK_EXTRACTION_SYSTEM_PROMPT = "你是一个专业的知识图谱构建助手。请从文本中提取实体和关系，并以JSON格式返回。"
+
+CHUNK_EXTRACTION_USER_PROMPT_HEAD = """
+请从文本中提取实体和关系，并以JSON格式返回。
+
+请返回JSON数组格式，每个元素包含subject（主体）、predicate（关系）、object（客体）：
+[
+    {"subject": "实体1", "predicate": "关系", "object": "实体2"},
+    {"subject": "实体3", "predicate": "关系", "object": "实体4"}
+]
+
+要求：
+1. 关系词（predicate）最多3个字
+2. 只返回JSON数组，不要其他内容
+3. 确保JSON格式正确
+
+文本：
+"""
+
+BATCH_EXTRACTION_USER_PROMPT_HEAD = """
+请分别从下面每个文本块中提取实体和关系，并以JSON格式返回。
+
+请返回JSON数组格式，每个文本块对应一个元素，chunk为文本块编号，triples为该块的三元组列表，
+每个三元组包含subject（主体）、predicate（关系）、object（客体）：
+[
+    {"chunk": 1, "triples": [{"subject": "实体1", "predicate": "关系", "object": "实体2"}]},
+    {"chunk": 2, "triples": [{"subject": "实体3", "predicate": "关系", "object": "实体4"}]}
+]
+
+要求：
+1. 关系词（predicate）最多3个字
+2. 只返回JSON数组，不要其他内容
+3. 确保JSON格式正确
+
+"""
+
+def get_batch_extraction_user_prompt(chunks):
+    return BATCH_EXTRACTION_USER_PROMPT_HEAD + "\n\n".join(f"### 文本块 {i}\n{chunk}" for i, chunk in enumerate(chunks, 1))
+
 # Phase 2: Entity standardization prompts
 ENTITY_RESOLUTION_SYSTEM_PROMPT = """
 You are an expert in entity resolution and knowledge representation.
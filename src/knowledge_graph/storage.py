@@ -0,0 +1,100 @@
+"""Storage helpers for knowledge graph data.
+
+Triples are stored as NDJSON (one triple per line) next to a small
+``.meta.json`` sidecar, so that metadata can be read without loading the
+whole graph. Legacy single-file JSON outputs (``{"metadata": ..., "knowledge_graph": [...]}``)
+are still readable.
+"""
+import json
+from pathlib import Path
+
+NDJSON_SUFFIX = ".ndjson"
+META_SUFFIX = ".meta.json"
+
+def iter_ndjson(path):
+    """Yield the records of an NDJSON file one at a time."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def load_ndjson(path):
+    """Load all records of an NDJSON file into a list."""
+    return list(iter_ndjson(path))
+
+def write_ndjson(path, items):
+    """
+    Write records to an NDJSON file, one JSON object per line.
+
+    Args:
+        path: Output file path
+        items: Iterable of JSON-serialisable records
+
+    Returns:
+        Number of records written
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count
+
+def save_kg(base_path, triples, metadata):
+    """
+    Save a knowledge graph as ``<base>.ndjson`` plus a ``<base>.meta.json`` sidecar.
+
+    Args:
+        base_path: Output path without suffix, e.g. ``kg_json/policy_kg_2003``
+        triples: Iterable of triple dictionaries
+        metadata: Metadata dictionary
+
+    Returns:
+        Path to the NDJSON file
+    """
+    base_path = Path(base_path)
+    ndjson_file = base_path.with_name(base_path.name + NDJSON_SUFFIX)
+    write_ndjson(ndjson_file, triples)
+
+    # Metadata goes last so its presence marks a complete graph
+    with open(base_path.with_name(base_path.name + META_SUFFIX), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+    return ndjson_file
+
+def list_kg_files(kg_dir, prefix):
+    """
+    Find saved knowledge graphs named ``<prefix><key>``, e.g. ``policy_kg_2003``.
+
+    Returns:
+        Dict mapping the key (as int when numeric) to the file holding its metadata,
+        preferring the ``.meta.json`` sidecar over a legacy single-file JSON.
+    """
+    files = {}
+    for path in Path(kg_dir).glob(f"{prefix}*.json"):
+        key = path.name.split('.')[0][len(prefix):]
+        try:
+            key = int(key)
+        except ValueError:
+            pass
+        if path.name.endswith(META_SUFFIX) or key not in files:
+            files[key] = path
+    return dict(sorted(files.items(), key=lambda item: str(item[0])))
+
+def load_kg_metadata(path):
+    """Load the metadata of a saved knowledge graph (sidecar or legacy JSON)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if Path(path).name.endswith(META_SUFFIX):
+        return data
+    return data.get('metadata', {})
+
+def load_kg_triples(path):
+    """Load the triples of a saved knowledge graph given its metadata file (sidecar or legacy JSON)."""
+    path = Path(path)
+    if path.name.endswith(META_SUFFIX):
+        return load_ndjson(path.with_name(path.name[:-len(META_SUFFIX)] + NDJSON_SUFFIX))
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('knowledge_graph', [])
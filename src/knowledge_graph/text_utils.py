@@ -2,89 +2,200 @@
 Text processing utilities for the knowledge graph generator.
 """
 import re
+from collections import namedtuple
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# 文本块、其词数（按 count_words 统计）及其在原文中的 (start, end) 偏移量
+Chunk = namedtuple('Chunk', ['text', 'word_count', 'start', 'end'], defaults=(None, None))
+
+# 预编译的正则表达式（模块加载时编译一次）
+# 句子边界：句末标点（可带引号）或省略号之后、且后面不是标点或引号的位置；以及已有的换行
+_SENTENCE_BOUNDARY = re.compile('(?:\\.{6}|\\.{3}|[。!?！？]["\'"]?)(?=[^，。！？!?"\'"])|\n')
+# U+4E00–U+9FFF 的UTF-8编码首字节为 0xE4–0xE9；首字节 0xE4 且第二字节 < 0xB8 的是 U+4000–U+4DFF
+_NON_CJK_LEAD_BYTES = bytes(b for b in range(256) if not 0xE4 <= b <= 0xE9)
+_BELOW_CJK_RANGE = re.compile(rb'\xe4[\x80-\xb7]')
+_WHITESPACE = re.compile(r'\s+')
+# 字符级替换表：删除零宽空格，统一中英文引号
+_CHAR_TRANSLATION = str.maketrans({
+    '\u200b': None,
+    '\ufeff': None,
+    '“': '"',
+    '”': '"',
+    '‘': "'",
+    '’': "'",
+})
+_ELLIPSIS_RUN = re.compile(r'\.{3,}')
+_SENTENCE_GAP = re.compile(r'([。!?！？])\s*([^"\'\n])')
+
+def _iter_sentence_spans(text, start, end):
+    """单次扫描，产出 text[start:end] 内各句子（已去除首尾空白）的 (start, end) 偏移量"""
+    pos = start
+    for match in _SENTENCE_BOUNDARY.finditer(text, start, end):
+        boundary = match.end() if match.group() != '\n' else match.start()
+        yield from _stripped_span(text, pos, boundary)
+        pos = match.end()
+    yield from _stripped_span(text, pos, end)
+
+def _stripped_span(text, start, end):
+    """去除 text[start:end] 首尾空白后的偏移量；为空白时不产出"""
+    piece = text[start:end]
+    stripped = piece.strip()
+    if stripped:
+        offset = start + len(piece) - len(piece.lstrip())
+        yield offset, offset + len(stripped)
 
 def split_into_sentences(text):
     """将文本分割成句子"""
-    # 基本句子结束的正则模式
-    text = re.sub('([。!?！？])([^"\'"])', '\\1\n\\2', text)
-    # 省略号(6个点)结束的句子
-    text = re.sub('(\\.{6})([^"\'"])', '\\1\n\\2', text)
-    # 省略号(3个点)结束的句子
-    text = re.sub('(\\.{3})([^"\'"])', '\\1\n\\2', text)
-    # 引号结束的句子
-    text = re.sub('([。!?！？]["\'])([^，。！？!?])', '\\1\n\\2', text)
-    return [s.strip() for s in text.split('\n') if s.strip()]
+    return [text[start:end] for start, end in _iter_sentence_spans(text, 0, len(text))]
 
 def count_words(text):
     """统计词数，支持中英文"""
     # 英文按空格分词
     english_words = len(text.split())
     # 中文字符计数
-    chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
-    return english_words + chinese_chars
+    return english_words + _count_cjk_chars(text)
 
-def chunk_text(text, max_length=200, overlap=20, respect_sentences=True, respect_paragraphs=True):
+@lru_cache(maxsize=8)
+def get_token_counter(model=None):
     """
-    智能分块处理文本，支持中英文，保持句子和段落的完整性。
-    
+    获取按模型分词器统计token数的函数，用于按token预算分块。
+
     Args:
-        text: 要处理的输入文本
-        max_length: 每个块的最大词数
-        overlap: 块之间的重叠词数
-        respect_sentences: 是否在句子边界处分块
-        respect_paragraphs: 是否优先在段落边界处分块
-        
+        model: 模型名称；tiktoken 不认识的模型使用 cl100k_base 编码
+
     Returns:
-        文本块列表
+        count_tokens(text) 函数；未安装 tiktoken 时返回 None
     """
-    # 处理空文本
-    if not text or not text.strip():
-        return []
+    if tiktoken is None:
+        return None
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except (KeyError, TypeError):
+        encoding = tiktoken.get_encoding("cl100k_base")
 
-    # 按段落分割
+    def count_tokens(text):
+        return len(encoding.encode(text, disallowed_special=()))
+    return count_tokens
+
+def _count_cjk_chars(text):
+    """统计 U+4E00–U+9FFF 范围内的汉字数：按UTF-8首字节扫描字节串，避免逐字符的正则匹配"""
+    data = text.encode('utf-8')
+    count = len(data.translate(None, _NON_CJK_LEAD_BYTES))
+    if count:
+        count -= len(_BELOW_CJK_RANGE.findall(data))
+    return count
+
+def _paragraph_spans(text, respect_paragraphs=True):
+    """返回段落在原文中的 (start, end) 偏移量，已去除首尾空白"""
+    spans = []
     if respect_paragraphs:
-        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+        pos = 0
+        for paragraph in text.split('\n\n'):
+            stripped = paragraph.strip()
+            if stripped:
+                start = text.find(stripped, pos)
+                spans.append((start, start + len(stripped)))
+            pos += len(paragraph) + 2
     else:
-        paragraphs = [text]
+        stripped = text.strip()
+        start = text.find(stripped)
+        spans.append((start, start + len(stripped)))
+    return spans
 
-    chunks = []
-    current_chunk = []
+def _chunk_bounds(text, max_length, overlap, respect_sentences, respect_paragraphs, length_fn=None):
+    """计算各文本块的 (start, end, word_count)，词数在分块时顺带累计；length_fn 为块大小的度量（默认按词数）"""
+    # 处理空文本
+    if not text or not text.strip():
+        return []
+
+    bounds = []
+    current_chunk = []  # 当前块内句子的 (start, end, length, word_count)
     current_length = 0
-    last_sentences = []  # 用于存储overlap部分的句子
+    current_words = 0
+
+    for para_start, para_end in _paragraph_spans(text, respect_paragraphs):
+        if respect_sentences:
+            sentences = _iter_sentence_spans(text, para_start, para_end)
+        else:
+            sentences = [(para_start, para_end)]
+
+        for sent_start, sent_end in sentences:
+            sentence = text[sent_start:sent_end]
+            sentence_words = count_words(sentence)
+            # 每个句子只度量一次，重叠部分沿用已缓存的长度
+            sentence_length = length_fn(sentence) if length_fn else sentence_words
 
-    for paragraph in paragraphs:
-        sentences = split_into_sentences(paragraph) if respect_sentences else [paragraph]
-        
-        for sentence in sentences:
-            sentence_length = count_words(sentence)
-            
             # 如果单个句子超过最大长度，强制分割
             if sentence_length > max_length:
                 if current_chunk:
-                    chunks.append(' '.join(current_chunk))
-                    last_sentences = current_chunk[-2:] if len(current_chunk) >= 2 else current_chunk
-                chunks.append(sentence)
+                    bounds.append((current_chunk[0][0], current_chunk[-1][1], current_words))
+                bounds.append((sent_start, sent_end, sentence_words))
                 current_chunk = []
                 current_length = 0
+                current_words = 0
                 continue
-            
+
             # 检查是否需要创建新的块
             if current_length + sentence_length > max_length:
                 if current_chunk:
-                    chunks.append(' '.join(current_chunk))
-                    last_sentences = current_chunk[-2:] if len(current_chunk) >= 2 else current_chunk
-                    # 添加重叠部分
-                    current_chunk = last_sentences if overlap > 0 else []
-                    current_length = sum(count_words(s) for s in current_chunk)
-            
-            current_chunk.append(sentence)
+                    bounds.append((current_chunk[0][0], current_chunk[-1][1], current_words))
+                    # 添加重叠部分（保留最后两个句子）
+                    current_chunk = current_chunk[-2:] if overlap > 0 else []
+                    current_length = sum(item[2] for item in current_chunk)
+                    current_words = sum(item[3] for item in current_chunk)
+
+            current_chunk.append((sent_start, sent_end, sentence_length, sentence_words))
             current_length += sentence_length
+            current_words += sentence_words
 
     # 处理最后一个块
     if current_chunk:
-        chunks.append(' '.join(current_chunk))
+        bounds.append((current_chunk[0][0], current_chunk[-1][1], current_words))
 
-    return chunks
+    return bounds
+
+def chunk_spans(text, max_length=200, overlap=20, respect_sentences=True, respect_paragraphs=True, length_fn=None):
+    """
+    计算文本块在原文中的 (start, end) 字符偏移量。
+
+    参数含义与 chunk_text 相同。块由原文切片得到，因此可以把提取结果映射回原文位置。
+
+    Returns:
+        (start, end) 偏移量列表
+    """
+    return [(start, end) for start, end, _ in _chunk_bounds(text, max_length, overlap, respect_sentences, respect_paragraphs, length_fn)]
+
+def chunk_text(text, max_length=200, overlap=20, respect_sentences=True, respect_paragraphs=True, length_fn=None):
+    """
+    智能分块处理文本，支持中英文，保持句子和段落的完整性。
+    
+    Args:
+        text: 要处理的输入文本
+        max_length: 每个块的最大词数（提供 length_fn 时为其度量单位，如token数）
+        overlap: 块之间的重叠词数
+        respect_sentences: 是否在句子边界处分块
+        respect_paragraphs: 是否优先在段落边界处分块
+        length_fn: 可选的长度函数（如 get_token_counter 的返回值），默认按 count_words 计
+        
+    Returns:
+        文本块列表（原文切片，偏移量见 chunk_spans）
+    """
+    return [text[start:end] for start, end in chunk_spans(text, max_length, overlap, respect_sentences, respect_paragraphs, length_fn)]
+
+def chunk_text_with_counts(text, max_length=200, overlap=20, respect_sentences=True, respect_paragraphs=True, length_fn=None):
+    """
+    与 chunk_text 相同，但同时返回每个块的词数（分块时已计算，无需再次统计）和偏移量。
+    
+    Returns:
+        Chunk(text, word_count, start, end) 列表
+    """
+    return [Chunk(text[start:end], word_count, start, end)
+            for start, end, word_count in _chunk_bounds(text, max_length, overlap, respect_sentences, respect_paragraphs, length_fn)]
 
 def normalize_text(text):
     """
@@ -99,19 +210,16 @@ def normalize_text(text):
     if not text:
         return ""
         
-    # 统一换行符
-    text = re.sub(r'[\r\n]+', '\n', text)
+    # 删除零宽空格、统一引号（单次查表替换）
+    text = text.translate(_CHAR_TRANSLATION)
     
-    # 删除连续的空格
-    text = re.sub(r'\s+', ' ', text)
+    # 合并连续的空白（包括换行）
+    text = _WHITESPACE.sub(' ', text)
     
-    # 修复常见的标点符号问题
-    text = re.sub(r'[\u200b\ufeff]', '', text)  # 删除零宽空格
-    text = re.sub(r'[""]', '"', text)  # 统一引号
-    text = re.sub(r'['']', "'", text)  # 统一单引号
-    text = re.sub(r'\.{3,}', '...', text)  # 统一省略号
+    # 统一省略号
+    text = _ELLIPSIS_RUN.sub('...', text)
     
     # 确保句子之间有适当的空格
-    text = re.sub(r'([。!?！？])\s*([^"\'\n])', r'\1 \2', text)
+    text = _SENTENCE_GAP.sub(r'\1 \2', text)
     
     return text.strip()
\ No newline at end of file
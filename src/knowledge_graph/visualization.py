@@ -1,13 +1,109 @@
 """Visualization utilities for knowledge graphs."""
 import networkx as nx
+import numpy as np
+import heapq
 import json
+import math
+import multiprocessing
+import operator
 import re
 import os
-from pyvis.network import Network
+import random
+from html import escape
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Union
+
+try:
+    import igraph  # Optional: C implementations of the graph metrics
+except ImportError:
+    igraph = None
+
+try:
+    from fa2 import ForceAtlas2  # Optional: Cython ForceAtlas2 layout with Barnes-Hut
+except ImportError:
+    ForceAtlas2 = None
+
+try:
+    import orjson  # Optional: faster JSON serialization for large graphs
+except ImportError:
+    orjson = None
+
+# PyVis's default centered header, and the empty <h1> some PyVis versions emit
+_HEADER_MARKERS = re.compile(r'(<center>\s*<h1>.*?</h1>\s*</center>)|<h1></h1>')
+
+# Above this many drawn nodes the page is written directly instead of being rendered by
+# PyVis; kept below MAX_RENDERED_NODES so pruned graphs take the direct path as well
+DIRECT_HTML_THRESHOLD = 500
+
+# Default for [visualization] max_nodes: larger graphs are drawn as the subgraph of
+# their highest-degree nodes, since vis.js becomes unusable long before it gets slow
+MAX_RENDERED_NODES = 1000
+
+# vis-network (the version bundled with pyvis) and Bootstrap as loaded from CDNs; directly written
+# pages inline pyvis's own copy of vis-network and only fall back to the CDN without it
+_VIS_NETWORK_JS = "https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/vis-network.min.js"
+_VIS_NETWORK_CSS = "https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/dist/vis-network.min.css"
+_BOOTSTRAP_CSS = "https://cdn.jsdelivr.net/npm/bootstrap@5.0.0-beta3/dist/css/bootstrap.min.css"
+
+@dataclass(frozen=True)
+class VizConfig:
+    """Drawing settings from the ``[visualization]`` config section, resolved once per call."""
+    edge_smooth: Union[bool, str] = False
+    max_nodes: int = MAX_RENDERED_NODES
+    
+    @classmethod
+    def from_dict(cls, config, edge_smooth=None):
+        """
+        Resolve the settings from a configuration dictionary.
+        
+        Args:
+            config: Configuration dictionary (may be None)
+            edge_smooth: Edge smoothing setting; overrides the config when not None
+        """
+        section = (config or {}).get("visualization", {})
+        if edge_smooth is None:
+            edge_smooth = section.get("edge_smooth", False)
+        return cls(edge_smooth=edge_smooth, max_nodes=section.get("max_nodes", MAX_RENDERED_NODES))
+
+# The graph container div in PyVis's page, which our template replaces
+_PYVIS_CONTAINER = '<div id="mynetwork" class="card-body"></div>'
+
+# The graph container div in our HTML template
+_NETWORK_CONTAINER = re.compile(r'<div id="mynetwork"[^>]*></div>')
+
+# Below this many nodes node sizes come from degree alone; betweenness and eigenvector
+# centrality add cost without visible difference at that size
+SMALL_GRAPH_THRESHOLD = 20
+
+# Above this many nodes, betweenness is estimated from a sample of source nodes
+BETWEENNESS_SAMPLE_THRESHOLD = 200
+
+# Above this many nodes the layout is computed in Python and the browser's physics simulation is off
+PRECOMPUTED_LAYOUT_THRESHOLD = 500
+
+# Power iterations tried first for eigenvector centrality (networkx's default); most graphs converge well within it
+EIGENVECTOR_MAX_ITER = 100
+
+# When power iteration does not converge, components up to this many nodes are solved with a
+# dense LAPACK eigensolver, larger ones with a longer power iteration
+DENSE_EIGENVECTOR_LIMIT = 1000
+
+@lru_cache(maxsize=1)
+def _load_louvain():
+    """Import python-louvain on first use; None if it is not installed."""
+    try:
+        import community as community_louvain
+    except ImportError:
+        return None
+    return community_louvain
 
 # HTML template for visualization is now stored in a separate file
+@lru_cache(maxsize=1)
 def _load_html_template():
-    """Load the HTML template from the template file."""
+    """Load the HTML template from the template file (read once per process)."""
     template_path = os.path.join(os.path.dirname(__file__), 'templates', 'graph_template.html')
     try:
         with open(template_path, 'r', encoding='utf-8') as f:
@@ -16,6 +112,21 @@ def _load_html_template():
         print(f"Warning: Could not load template file: {e}")
         return '<div id="mynetwork" class="card-body"></div>'  # Fallback to basic template
 
+@lru_cache(maxsize=1)
+def _load_vis_network_assets():
+    """Read the vis-network script and stylesheet bundled with pyvis (once per process); None if missing."""
+    try:
+        import pyvis
+        lib_dir = os.path.join(os.path.dirname(pyvis.__file__), 'lib', 'vis-9.1.2')
+        with open(os.path.join(lib_dir, 'vis-network.min.js'), 'r', encoding='utf-8') as f:
+            script = f.read()
+        with open(os.path.join(lib_dir, 'vis-network.css'), 'r', encoding='utf-8') as f:
+            stylesheet = f.read()
+    except (ImportError, OSError) as e:
+        print(f"Warning: Could not load pyvis's vis-network files, using the CDN: {e}")
+        return None
+    return script, stylesheet
+
 def visualize_knowledge_graph(triples, output_file="knowledge_graph.html", edge_smooth=None, config=None):
     """
     从主谓宾三元组创建并可视化知识图谱。
@@ -31,11 +142,8 @@ def visualize_knowledge_graph(triples, output_file="knowledge_graph.html", edge_
     Returns:
         包含图谱统计信息的字典
     """
-    # Determine edge smoothing from config if not explicitly provided
-    if edge_smooth is None and config is not None:
-        edge_smooth = config.get("visualization", {}).get("edge_smooth", False)
-    elif edge_smooth is None:
-        edge_smooth = False
+    # Resolve the drawing settings once; an explicit edge_smooth overrides the config
+    viz_config = VizConfig.from_dict(config, edge_smooth)
     
     if not triples:
         print("Warning: No triples provided for visualization")
@@ -43,46 +151,130 @@ def visualize_knowledge_graph(triples, output_file="knowledge_graph.html", edge_
         
     print(f"Processing {len(triples)} triples for visualization")
     
-    # Create a directed graph
-    G = nx.DiGraph()
+    # Node and edge attributes, reused when the same triples are drawn again
+    get_spo = operator.itemgetter("subject", "predicate", "object")
+    triple_key = tuple((*get_spo(triple), bool(triple.get("inferred", False))) for triple in triples)
+    vis_nodes, vis_edges, node_count, community_count, inferred_count, positioned = _analyze_graph(triple_key, viz_config.max_nodes)
+    
+    options_json = _get_visualization_options_json(len(vis_nodes), len(triples) if len(vis_nodes) == node_count else len(vis_edges), positioned)
+    if len(vis_nodes) < node_count:
+        nodes_label = f'Top {len(vis_nodes)} of {node_count} Nodes'
+    else:
+        nodes_label = f'{node_count} Nodes'
+    title = f'Knowledge Graph - {nodes_label}, {len(triples)} Relationships, {community_count} Communities'
+    
+    if len(vis_nodes) > DIRECT_HTML_THRESHOLD:
+        # Large graph: skip PyVis's per-element template rendering and embed the data directly
+        _write_direct_html(output_file, vis_nodes, vis_edges, options_json, title)
+    else:
+        # Create a PyVis network with explicit configuration
+        # (pyvis and its jinja2 templates are only imported when a graph is actually drawn)
+        from pyvis.network import Network
+        net = Network(
+            height="100%", 
+            width="100%", 
+            directed=True,
+            notebook=False,
+            cdn_resources='in_line',  # Include resources in-line to ensure independence
+            bgcolor="#ffffff",
+            font_color=True,
+            select_menu=False,
+            filter_menu=False
+        )
+        _add_to_network(net, vis_nodes, vis_edges)
+        
+        # Set all visualization options in one go with proper JSON
+        net.set_options(options_json)
+        
+        # Save the network as HTML and modify with custom template
+        _save_and_modify_html(net, output_file, title)
+    
+    # Return statistics
+    original_edges = len(triples) - inferred_count
+    stats = {
+        "nodes": node_count,
+        "edges": len(triples),
+        "original_edges": original_edges,
+        "inferred_edges": inferred_count,
+        "communities": community_count
+    }
+    print(f"Graph Statistics: {_to_json(stats, indent=True)}")
+    return stats
+
+@lru_cache(maxsize=8)
+def _analyze_graph(triple_key, max_nodes=0):
+    """
+    Compute the node and edge attributes to draw: centrality-based sizes, community colors
+    and merged edge labels.
+    
+    Above max_nodes nodes only the highest-degree ones and the edges between them are
+    drawn; their metrics, sizes and colors still come from the full graph.
+    
+    Cached on the triples, so redrawing the same graph (e.g. with another edge style)
+    skips the graph metrics. The returned tuples are shared between calls and must not
+    be modified.
     
+    Args:
+        triple_key: Tuple of (subject, predicate, object, inferred) tuples
+        max_nodes: Maximum number of nodes to draw (0 for no limit)
+        
+    Returns:
+        Tuple of (vis_nodes, vis_edges, node_count, community_count, inferred_count, positioned),
+        where vis_nodes holds (node, attributes) and vis_edges (source, target, attributes) tuples,
+        node_count is the number of nodes in the full graph and positioned tells whether the
+        nodes carry precomputed x/y coordinates
+    """
     # Dictionary to store node groups for community visualization
     node_communities = {}
     
-    # Set of all unique nodes
-    all_nodes = set()
+    # Node names interned to integer ids in first-seen order; the graph
+    # algorithms below run on the ids and names are only used for output
+    node_ids = {}
     
     # Track inferred vs. original relationships
     inferred_edges = set()
     
-    # Add all subjects and objects as nodes
-    for triple in triples:
-        subject = triple["subject"]
-        obj = triple["object"]
-        all_nodes.add(subject)
-        all_nodes.add(obj)
+    # Undirected (subject, object) pairs, deduplicated in first-seen order
+    undirected_edges = {}
+    
+    # Predicates of each directed (subject, object) pair, and whether all of them are inferred
+    edge_predicates = defaultdict(list)
+    edge_inferred = {}
+    
+    # Single pass: collect nodes, undirected pairs and directed edges together
+    for subject, predicate, obj, is_inferred in triple_key:
+        edge = (node_ids.setdefault(subject, len(node_ids)), node_ids.setdefault(obj, len(node_ids)))
+        undirected_edges[edge] = None
         
         # Mark inferred relationships
-        if triple.get("inferred", False):
-            inferred_edges.add((subject, obj))
+        if is_inferred:
+            inferred_edges.add(edge)
+        
+        edge_predicates[edge].append(predicate)
+        edge_inferred[edge] = edge_inferred.get(edge, True) and is_inferred
+    
+    names = list(node_ids)
+    all_nodes = range(len(names))
     
-    print(f"Found {len(all_nodes)} unique nodes")
+    print(f"Found {len(names)} unique nodes")
     print(f"Found {len(inferred_edges)} inferred relationships")
     
-    # Create an undirected graph for community detection and centrality measures
-    G_undirected = nx.Graph()
+    # Build the igraph graph once, straight from the integer ids; shared by the metric computations below
+    ig = _to_igraph(len(names), undirected_edges)
     
-    for triple in triples:
-        G_undirected.add_edge(triple["subject"], triple["object"])
+    # The NetworkX graph is only needed for small graphs and the fallbacks without igraph
+    # Parallel predicates repeat the same pair, so insert the deduplicated pairs
+    needs_networkx = ig is None or len(names) < SMALL_GRAPH_THRESHOLD
+    G_undirected = nx.from_edgelist(undirected_edges) if needs_networkx else None
     
     # Calculate centrality metrics
-    centrality_metrics = _calculate_centrality_metrics(G_undirected, all_nodes)
+    centrality_metrics = _calculate_centrality_metrics(G_undirected, all_nodes, ig)
     betweenness = centrality_metrics["betweenness"]
     degree = centrality_metrics["degree"]
     eigenvector = centrality_metrics["eigenvector"]
     
     # Calculate communities
-    node_communities, community_count = _detect_communities(G_undirected, all_nodes)
+    node_communities, community_count = _detect_communities(G_undirected, all_nodes, ig)
     
     # Define colors for communities - these are standard colorblind-friendly colors
     colors = ['#e41a1c', '#377eb8', '#4daf4a', '#984ea3', '#ff7f00', '#ffff33', '#a65628', '#f781bf']
@@ -90,91 +282,324 @@ def visualize_knowledge_graph(triples, output_file="knowledge_graph.html", edge_
     # Calculate node sizes based on centrality metrics
     node_sizes = _calculate_node_sizes(all_nodes, betweenness, degree, eigenvector)
     
-    # Add nodes to the graph with community colors and sizes
-    for node in all_nodes:
-        community = node_communities[node]
-        G.add_node(
-            node, 
-            color=colors[community % len(colors)],  # Ensure we don't go out of bounds
-            label=node,  # Explicit label
-            title=f"{node} - Connections: {degree.get(node, 0)}",  # Simple tooltip without HTML tags
-            size=node_sizes[node]
-        )
+    # Color every node in one vectorized palette lookup, wrapping community ids
+    # around the palette so we don't go out of bounds
+    community_ids = np.fromiter((node_communities[i] for i in all_nodes), dtype=np.int64, count=len(names))
+    node_colors = np.array(colors)[community_ids % len(colors)].tolist()
+    degree_get = degree.get
     
-    # Add edges with predicates as labels
-    for triple in triples:
-        subject = triple["subject"]
-        obj = triple["object"]
-        
-        # Determine if this is an inferred relationship
-        is_inferred = triple.get("inferred", False)
-        
-        G.add_edge(
-            subject, 
-            obj, 
-            title=triple["predicate"],
-            label=triple["predicate"],
-            arrows="to",   # Add arrow direction
-            width=1,       # Edge width
-            dashes=is_inferred,  # Use dashed lines for inferred relationships
-            color="#555555" if is_inferred else None  # Lighter color for inferred relationships
-        )
+    # Very large graphs: keep the highest-degree nodes (ties in first-seen order)
+    shown = all_nodes
+    kept = None
+    if max_nodes and len(names) > max_nodes:
+        shown = sorted(heapq.nlargest(max_nodes, all_nodes, key=lambda i: degree_get(i, 0)))
+        kept = set(shown)
+        print(f"Drawing the {max_nodes} highest-degree nodes of {len(names)}")
     
-    # Create a PyVis network with explicit configuration
-    net = Network(
-        height="100%", 
-        width="100%", 
-        directed=True,
-        notebook=False,
-        cdn_resources='in_line',  # Include resources in-line to ensure independence
-        bgcolor="#ffffff",
-        font_color=True,
-        select_menu=False,
-        filter_menu=False
-    )
+    # Large graphs get their layout computed here so the browser can skip the simulation
+    positions = None
+    if len(shown) > PRECOMPUTED_LAYOUT_THRESHOLD:
+        if kept is not None:
+            # Lay out only the drawn subgraph; both keep the original node ids
+            G_undirected = G_undirected.subgraph(shown) if G_undirected is not None else None
+            ig = ig.induced_subgraph(shown) if ig is not None else None
+        positions = _compute_layout(G_undirected, ig)
+    
+    # Node attributes with community colors and sizes, keyed by name again for output
+    vis_nodes = tuple((names[i], {
+        "color": node_colors[i],
+        "label": str(names[i]),  # Explicit label, always a string
+        "title": f"{names[i]} - Connections: {degree_get(i, 0)}",  # Simple tooltip without HTML tags
+        "shape": "dot",
+        "size": node_sizes[i],
+        "font": {'color': '#000000'}  # Explicitly set font color to black
+    }) for i in shown)
+    if positions is not None:
+        for i, (_, node_options) in zip(shown, vis_nodes):
+            node_options["x"], node_options["y"] = positions[i]
+    
+    # One edge per (subject, object) pair: the first predicate as label,
+    # all distinct predicates in the tooltip
+    vis_edges = []
+    for (subject, obj), predicates in edge_predicates.items():
+        if kept is not None and (subject not in kept or obj not in kept):
+            continue
+        edge_options = {
+            "title": "; ".join(dict.fromkeys(predicates)),
+            "label": predicates[0],
+            "arrows": "to"   # Add arrow direction
+        }
+        if edge_inferred[(subject, obj)]:
+            edge_options["dashes"] = True  # Use dashed lines for inferred relationships
+            edge_options["color"] = "#555555"  # Lighter color for inferred relationships
+        vis_edges.append((names[subject], names[obj], edge_options))
     
     # Dump some debug info
-    print(f"Nodes in NetworkX graph: {G.number_of_nodes()}")
-    print(f"Edges in NetworkX graph: {G.number_of_edges()}")
+    print(f"Nodes in network: {len(vis_nodes)}")
+    print(f"Edges in network: {len(vis_edges)}")
     
-    # Add nodes and edges from NetworkX graph - do this explicitly for better control
-    _add_nodes_and_edges_to_network(net, G)
+    return vis_nodes, tuple(vis_edges), len(names), community_count, len(inferred_edges), positions is not None
+
+def _compute_layout(G_undirected, ig=None):
+    """
+    Compute node positions in vis-network coordinates.
     
-    # Set visualization options
-    options = _get_visualization_options(len(all_nodes), len(triples))
+    Uses ForceAtlas2 from the fa2 package (the same family of force model vis.js runs in
+    the browser) when available, then igraph's Fruchterman-Reingold layout (C), and
+    finally nx.spring_layout, which needs scipy at this graph size.
     
-    # Set all options in one go with proper JSON
-    net.set_options(json.dumps(options))
+    Returns:
+        Dict mapping node to (x, y), or None if no layout backend is available
+    """
+    # Spread the nodes so each gets roughly 200px of room
+    scale = 100 * math.sqrt(G_undirected.number_of_nodes() if G_undirected is not None else ig.vcount())
     
+    positions = _forceatlas2_layout(G_undirected, ig) if ForceAtlas2 is not None else None
+    if positions is not None:
+        extent = max((max(abs(x), abs(y)) for x, y in positions.values()), default=0) or 1
+        return {node: (x * scale / extent, y * scale / extent) for node, (x, y) in positions.items()}
     
-    # Save the network as HTML and modify with custom template
-    _save_and_modify_html(net, output_file, community_count, all_nodes, triples)
+    if ig is not None:
+        coords = ig.layout_fruchterman_reingold().coords
+        extent = max((max(abs(x), abs(y)) for x, y in coords), default=0) or 1
+        return {node: (x * scale / extent, y * scale / extent) for node, (x, y) in zip(ig.vs["name"], coords)}
     
-    # Return statistics
-    original_edges = len(triples) - len(inferred_edges)
-    stats = {
-        "nodes": len(all_nodes),
-        "edges": len(triples),
-        "original_edges": original_edges,
-        "inferred_edges": len(inferred_edges),
-        "communities": len(set(node_communities.values()))
-    }
-    print(f"Graph Statistics: {json.dumps(stats, indent=2)}")
-    return stats
+    try:
+        positions = nx.spring_layout(G_undirected, iterations=50, seed=42, scale=scale)
+    except ImportError as e:
+        print(f"Skipping precomputed layout: {e}")
+        return None
+    return {node: (float(x), float(y)) for node, (x, y) in positions.items()}
+
+def _forceatlas2_layout(G_undirected, ig=None):
+    """
+    Run fa2's ForceAtlas2 on the graph's sparse adjacency matrix.
+    
+    fa2's own forceatlas2_networkx_layout calls networkx.to_scipy_sparse_matrix in
+    fa2 0.3.5, which networkx 3 removed, so the matrix is built here instead.
+    
+    Returns:
+        Dict mapping node to (x, y), or None if the layout fails
+    """
+    try:
+        if G_undirected is not None:
+            nodes = list(G_undirected)
+            adjacency = nx.to_scipy_sparse_array(G_undirected, nodelist=nodes, dtype=float)
+        else:
+            nodes = ig.vs["name"]
+            adjacency = ig.get_adjacency_sparse()
+        forceatlas2 = ForceAtlas2(barnesHutOptimize=True, barnesHutTheta=1.2, verbose=False)
+        coords = forceatlas2.forceatlas2(adjacency, pos=None, iterations=200)
+    except Exception as e:
+        # Optional third-party backend: fall through to the igraph/networkx layouts
+        print(f"ForceAtlas2 layout failed, using a fallback layout: {e}")
+        return None
+    return {node: (float(x), float(y)) for node, (x, y) in zip(nodes, coords)}
 
-def _calculate_centrality_metrics(G_undirected, all_nodes):
-    """Calculate centrality metrics for the graph nodes."""
+def _add_to_network(net, vis_nodes, vis_edges):
+    """
+    Bulk-load nodes and edges into a PyVis network.
+    
+    Builds the same dicts as net.add_node / net.add_edge, but skips their per-call checks
+    against PyVis's node id list, which make adding a graph quadratic in its size.
+    Node ids are unique and every edge endpoint is a node by construction.
+    """
+    # PyVis's add_node replaces the node font when the network has a font color
+    node_font = {"color": net.font_color} if net.font_color else None
+    for node, node_options in vis_nodes:
+        options = dict(node_options, id=node)
+        if node_font:
+            options["font"] = dict(node_font)
+        net.nodes.append(options)
+        net.node_ids.append(node)
+        net.node_map[node] = options
+    
+    net.edges.extend(dict(edge_options, **{"from": source, "to": target}) for source, target, edge_options in vis_edges)
+
+def _to_igraph(node_count, edges):
+    """
+    Build an undirected igraph.Graph over the integer node ids 0..node_count-1.
+    
+    Args:
+        node_count: Number of nodes
+        edges: Iterable of (source, target) id pairs; reversed duplicates are merged
+        
+    Returns:
+        The graph (vertex i named i), or None if igraph is not installed
+    """
+    if igraph is None:
+        return None
+    pairs = dict.fromkeys((u, v) if u <= v else (v, u) for u, v in edges)
+    ig = igraph.Graph(n=node_count, edges=list(pairs), directed=False)
+    ig.vs["name"] = list(range(node_count))
+    return ig
+
+def _calculate_centrality_metrics(G_undirected, all_nodes, ig=None, k=None, distance_cutoff=None):
+    """
+    Calculate centrality metrics for the graph nodes (using igraph when available).
+    
+    Args:
+        G_undirected: Undirected NetworkX graph (may be None when ig is given and the graph is not small)
+        all_nodes: Collection of all nodes
+        ig: Optional igraph copy of the graph (see _to_igraph)
+        k: Number of source nodes sampled for betweenness (networkx only). Defaults to
+           max(50, sqrt(n)) above BETWEENNESS_SAMPLE_THRESHOLD nodes, exact otherwise.
+           _calculate_node_sizes divides each metric by its maximum, so any overall scale
+           error of the estimate cancels out and only the relative values matter.
+        distance_cutoff: Only count shortest paths up to this length (igraph only)
+    """
+    n = len(all_nodes)
+    if n < SMALL_GRAPH_THRESHOLD:
+        # Small graph: node importance comes from degree alone
+        return {
+            "betweenness": dict.fromkeys(all_nodes, 0.0),
+            "degree": dict(G_undirected.degree()),
+            "eigenvector": dict.fromkeys(all_nodes, 0.5)
+        }
+    
+    if ig is not None:
+        return _calculate_centrality_metrics_igraph(ig, all_nodes, distance_cutoff)
+    
+    if k is None and n > BETWEENNESS_SAMPLE_THRESHOLD:
+        k = max(50, int(math.sqrt(n)))
+    
     # Betweenness centrality - nodes that bridge communities are more important
-    betweenness = nx.betweenness_centrality(G_undirected)
+    # Without igraph, large graphs split the BFS sources across processes
+    source_count = k if k is not None and k < n else n
+    if n > PRECOMPUTED_LAYOUT_THRESHOLD and (os.cpu_count() or 1) > 1:
+        betweenness = _parallel_betweenness(G_undirected, k if source_count < n else None)
+    elif source_count < n:
+        betweenness = nx.betweenness_centrality(G_undirected, k=k, seed=42)
+    else:
+        betweenness = nx.betweenness_centrality(G_undirected)
     
     # Degree centrality - nodes with more connections are more important
     degree = dict(G_undirected.degree())
     
     # Eigenvector centrality - nodes connected to high-value nodes are more important
+    eigenvector = _eigenvector_centrality(G_undirected, all_nodes)
+    
+    return {
+        "betweenness": betweenness,
+        "degree": degree,
+        "eigenvector": eigenvector
+    }
+
+def _betweenness_from_sources(G_undirected, sources):
+    """Unnormalized betweenness contributions of the given BFS sources (runs in a worker process)."""
+    return nx.betweenness_centrality_subset(G_undirected, sources=sources, targets=list(G_undirected), normalized=False)
+
+def _parallel_betweenness(G_undirected, k=None):
+    """
+    Betweenness centrality with Brandes' per-source BFS split across processes.
+    
+    Each source's shortest-path DAG is independent, so the sources are divided into one
+    partition per CPU and the partial sums are added up. Sources are sampled as
+    nx.betweenness_centrality(G_undirected, k=k, seed=42) samples them, and the sums are
+    rescaled by networkx itself, so both give the same values.
+    """
+    nodes = list(G_undirected)
+    n = len(nodes)
+    sources = random.Random(42).sample(nodes, k) if k is not None else nodes
+    
+    workers = os.cpu_count() or 1
+    partitions = [sources[i::workers] for i in range(workers) if sources[i::workers]]
+    betweenness = dict.fromkeys(nodes, 0.0)
+    # Spawned rather than forked: the caller may still have threads running (e.g. main()'s
+    # NDJSON writer), and a child forked while one holds a lock can deadlock
+    with ProcessPoolExecutor(max_workers=len(partitions), mp_context=multiprocessing.get_context("spawn")) as executor:
+        for partial in executor.map(_betweenness_from_sources, [G_undirected] * len(partitions), partitions):
+            for node, value in partial.items():
+                betweenness[node] += value
+    
+    # The subset values are already halved for undirected graphs; undo that to get
+    # the raw counts nx.betweenness_centrality normalizes
+    for node in betweenness:
+        betweenness[node] *= 2
+    return _rescale_betweenness(betweenness, n, sources if k is not None else None)
+
+def _rescale_betweenness(betweenness, n, sampled_nodes=None):
+    """
+    Normalize raw undirected betweenness counts with networkx's own rescaling, which
+    changed for sampled sources in networkx 3.5.
+    """
+    from networkx.algorithms.centrality.betweenness import _rescale
+    try:
+        return _rescale(betweenness, n, normalized=True, directed=False, endpoints=False, sampled_nodes=sampled_nodes)
+    except TypeError:
+        # networkx < 3.5
+        k = len(sampled_nodes) if sampled_nodes is not None else None
+        return _rescale(betweenness, n, normalized=True, directed=False, k=k, endpoints=False)
+
+def _eigenvector_centrality(G_undirected, all_nodes):
+    """
+    Eigenvector centrality on the largest connected component.
+    
+    Power iteration often fails to converge on disconnected KG graphs, and only gives
+    up after max_iter steps. So it runs on the largest component only, and nodes
+    outside that component score 0. Power iteration is tried first with a modest
+    max_iter; if it does not converge, components up to DENSE_EIGENVECTOR_LIMIT nodes
+    are solved directly with NumPy.
+    """
+    fallback = {node: 0.5 for node in all_nodes}
+    if G_undirected.number_of_nodes() <= 2:
+        return fallback
+    
+    if nx.is_connected(G_undirected):
+        component = G_undirected
+    else:
+        component = G_undirected.subgraph(max(nx.connected_components(G_undirected), key=len))
+        if component.number_of_nodes() <= 2:
+            return fallback
+    
     try:
-        eigenvector = nx.eigenvector_centrality(G_undirected, max_iter=1000)
-    except:
+        try:
+            scores = nx.eigenvector_centrality(component, max_iter=EIGENVECTOR_MAX_ITER)
+        except nx.PowerIterationFailedConvergence:
+            if component.number_of_nodes() <= DENSE_EIGENVECTOR_LIMIT:
+                scores = _dense_eigenvector_centrality(component)
+            else:
+                scores = nx.eigenvector_centrality(component, max_iter=1000)
+    except (nx.PowerIterationFailedConvergence, nx.NetworkXException, np.linalg.LinAlgError):
         # If eigenvector calculation fails (can happen with certain graph structures)
+        return fallback
+    
+    if component is G_undirected:
+        return scores
+    eigenvector = dict.fromkeys(all_nodes, 0.0)
+    eigenvector.update(scores)
+    return eigenvector
+
+def _dense_eigenvector_centrality(G):
+    """
+    Eigenvector centrality of a connected undirected graph from LAPACK's symmetric eigensolver.
+    
+    Unlike power iteration this cannot fail to converge (e.g. on bipartite graphs).
+    Scores are normalized to unit Euclidean norm like nx.eigenvector_centrality.
+    """
+    nodes = list(G)
+    _, vectors = np.linalg.eigh(nx.to_numpy_array(G, nodelist=nodes))
+    # The principal (Perron) eigenvector has a single sign; eigh may return it negated
+    principal = np.abs(vectors[:, -1])
+    principal /= np.linalg.norm(principal)
+    return dict(zip(nodes, principal.tolist()))
+
+def _calculate_centrality_metrics_igraph(ig, all_nodes, distance_cutoff=None):
+    """Same metrics as _calculate_centrality_metrics, computed in C by igraph and keyed by node name."""
+    nodes = ig.vs["name"]
+    n = len(nodes)
+    
+    # igraph returns raw pair counts; scale like networkx's normalized betweenness
+    scale = 2 / ((n - 1) * (n - 2)) if n > 2 else 1
+    raw_betweenness = ig.betweenness(directed=False, cutoff=distance_cutoff)
+    betweenness = {node: value * scale for node, value in zip(nodes, raw_betweenness)}
+    
+    degree = dict(zip(nodes, ig.degree()))
+    
+    # igraph scales eigenvector centrality to a maximum of 1; sizes are max-normalized anyway
+    try:
+        eigenvector = dict(zip(nodes, ig.eigenvector_centrality(directed=False)))
+    except igraph.InternalError:
         eigenvector = {node: 0.5 for node in all_nodes}
     
     return {
@@ -183,98 +608,75 @@ def _calculate_centrality_metrics(G_undirected, all_nodes):
         "eigenvector": eigenvector
     }
 
-def _detect_communities(G_undirected, all_nodes):
-    """Detect communities in the graph."""
-    try:
-        # Attempt to detect communities using Louvain method
-        import community as community_louvain
-        partition = community_louvain.best_partition(G_undirected)
-        community_count = len(set(partition.values()))
-        print(f"Detected {community_count} communities using Louvain method")
+def _detect_communities(G_undirected, all_nodes, ig=None):
+    """Detect communities in the graph (igraph's multilevel Louvain when available)."""
+    if ig is not None:
+        clustering = ig.community_multilevel()
+        partition = dict(zip(ig.vs["name"], clustering.membership))
+        community_count = len(clustering)
+        print(f"Detected {community_count} communities using Louvain method (igraph)")
         return partition, community_count
-    except:
-        # Fallback: assign community IDs based on degree for simplicity
-        node_communities = {}
-        for node in all_nodes:
-            node_degree = G_undirected.degree(node) if node in G_undirected else 0
-            # Ensure we have at least 0 as a community ID
-            community_id = max(0, node_degree) % 8  # Using modulo 8 to limit number of colors
-            node_communities[node] = community_id
-        community_count = len(set(node_communities.values()))
-        print(f"Using degree-based communities ({community_count} communities)")
-        return node_communities, community_count
+    
+    community_louvain = _load_louvain()
+    if community_louvain is not None:
+        try:
+            # Attempt to detect communities using Louvain method
+            partition = community_louvain.best_partition(G_undirected)
+            community_count = len(set(partition.values()))
+            print(f"Detected {community_count} communities using Louvain method")
+            return partition, community_count
+        except (ValueError, nx.NetworkXError) as e:
+            print(f"Louvain community detection failed: {e}")
+    
+    # Fallback: assign community IDs based on degree for simplicity
+    node_communities = {}
+    for node in all_nodes:
+        node_degree = G_undirected.degree(node) if node in G_undirected else 0
+        # Ensure we have at least 0 as a community ID
+        community_id = max(0, node_degree) % 8  # Using modulo 8 to limit number of colors
+        node_communities[node] = community_id
+    community_count = len(set(node_communities.values()))
+    print(f"Using degree-based communities ({community_count} communities)")
+    return node_communities, community_count
+
+# Weights of degree, betweenness and eigenvector centrality in the node importance score
+_IMPORTANCE_WEIGHTS = np.array([0.5, 0.3, 0.2])
 
 def _calculate_node_sizes(all_nodes, betweenness, degree, eigenvector):
     """Calculate node sizes based on centrality metrics."""
-    # Find max values for normalization
-    max_betweenness = max(betweenness.values()) if betweenness else 1
-    max_degree = max(degree.values()) if degree else 1
-    max_eigenvector = max(eigenvector.values()) if eigenvector else 1
+    nodes = list(all_nodes)
+    if not nodes:
+        return {}
+    count = len(nodes)
     
-    node_sizes = {}
-    for node in all_nodes:
-        # Normalize and combine metrics with weights
-        degree_norm = degree.get(node, 1) / max_degree
-        betweenness_norm = betweenness.get(node, 0) / max_betweenness if max_betweenness > 0 else 0
-        eigenvector_norm = eigenvector.get(node, 0) / max_eigenvector if max_eigenvector > 0 else 0
-        
-        # Calculate a weighted importance score (adjust weights as needed)
-        importance = 0.5 * degree_norm + 0.3 * betweenness_norm + 0.2 * eigenvector_norm
-        
-        # Scale node size - ensure minimum size and reasonable maximum
-        node_sizes[node] = 10 + (20 * importance)  # Size range from 10 to 30
-    
-    return node_sizes
-
-def _add_nodes_and_edges_to_network(net, G):
-    """Add nodes and edges from NetworkX graph to PyVis network."""
-    # Add nodes with all their attributes
-    for node_id in G.nodes():
-        node_data = G.nodes[node_id]
-        net.add_node(
-            node_id, 
-            color=node_data.get('color', '#4daf4a'),
-            label=str(node_id),  # Ensure label is a string
-            title=str(node_data.get('title', node_id)),  # Ensure title is a string
-            shape="dot",
-            size=node_data.get('size', 10),
-            font={'color': '#000000'}  # Explicitly set font color to black
-        )
+    # One row per metric, one column per node
+    metrics = np.empty((3, count))
+    metrics[0] = np.fromiter((degree.get(node, 1) for node in nodes), dtype=float, count=count)
+    metrics[1] = np.fromiter((betweenness.get(node, 0) for node in nodes), dtype=float, count=count)
+    metrics[2] = np.fromiter((eigenvector.get(node, 0) for node in nodes), dtype=float, count=count)
     
-    # Add edges with all their attributes
-    for edge in G.edges(data=True):
-        source, target, data = edge
-        
-        # Support for dashed lines for inferred relationships
-        edge_options = {
-            'title': data.get('title', ''),
-            'label': data.get('label', ''),
-            'arrows': "to"
-        }
-        
-        # Add dashes if specified
-        if data.get('dashes', False):
-            edge_options['dashes'] = True
-        
-        # Add color if specified
-        if data.get('color'):
-            edge_options['color'] = data.get('color')
-        
-        net.add_edge(source, target, **edge_options)
+    # Normalize each metric by its maximum (all-zero metrics stay zero)
+    maxima = metrics.max(axis=1, keepdims=True)
+    np.divide(metrics, maxima, out=metrics, where=maxima > 0)
+    
+    # Weighted importance score, scaled to a node size range from 10 to 30
+    sizes = 10 + 20 * (_IMPORTANCE_WEIGHTS @ metrics)
+    return dict(zip(nodes, sizes.tolist()))
 
-def _get_visualization_options(nodes_count, edges_count):
+def _get_visualization_options(nodes_count, edges_count, positioned=False):
     """
     Get visualization options for the network graph.
     
     Args:
         nodes_count (int): Number of nodes in the network
         edges_count (int): Number of edges in the network
+        positioned (bool): Whether the nodes carry precomputed positions
         
     Returns:
         dict: Network visualization options
     """
     # Get adaptive physics settings based on network size
-    physics_settings = _get_adaptive_physics_settings(nodes_count, edges_count)
+    physics_settings = _get_adaptive_physics_settings(nodes_count, edges_count, positioned)
     
     return {
         "physics": physics_settings,
@@ -317,31 +719,128 @@ def _get_visualization_options(nodes_count, edges_count):
         }
     }
 
-def _save_and_modify_html(net, output_file, community_count, all_nodes, triples):
+# Representative node counts of the physics size tiers in _get_adaptive_physics_settings
+_PHYSICS_TIER_NODES = (1, 101, 201)
+
+def _get_visualization_options_json(nodes_count, edges_count, positioned=False):
+    """
+    Get the visualization options serialized as JSON.
+    
+    The options only vary with the size tier (up to 100, up to 200 or more nodes), whether
+    the network is dense and whether positions are precomputed, so each of the few
+    possible variants is serialized once.
+    """
+    tier = 0 if nodes_count <= 100 else 1 if nodes_count <= 200 else 2
+    dense = edges_count / max(nodes_count, 1) > 5
+    return _options_json_for_tier(tier, dense, positioned)
+
+@lru_cache(maxsize=None)
+def _options_json_for_tier(tier, dense, positioned):
+    """Serialize the options for a size tier once (see _get_visualization_options_json)."""
+    nodes_count = _PHYSICS_TIER_NODES[tier]
+    return _to_json(_get_visualization_options(nodes_count, nodes_count * 6 if dense else 0, positioned))
+
+def _save_and_modify_html(net, output_file, title):
     """Save the network as HTML and modify with custom template."""
     # Instead of letting PyVis write to a file, we'll access its HTML directly
     # and write it ourselves with explicit UTF-8 encoding
     
     # Generate the HTML content
     # This happens internally in PyVis without writing to a file
-    net.generate_html()
+    html = net.generate_html(notebook=False)
+    
+    # Our title (including the "Top K of N Nodes" banner of pruned graphs) goes right above
+    # the graph container; pyvis 0.3.2 has no empty <h1> placeholder to fill in
+    heading = f'<h1>{escape(title)}</h1>\n'
+    container = html.find(_PYVIS_CONTAINER)
     
-    # Get the HTML from PyVis's internal html attribute
-    html = net.html
+    # Fix the duplicate title issue in one scan: remove the default PyVis headers
+    # (the empty h1 only receives our title if there is no container to put it next to)
+    edits = [(match.start(), match.end(), '' if match.group(1) or container != -1 else heading)
+             for match in _HEADER_MARKERS.finditer(html)]
+    
+    # Add our custom controls by replacing the div with the title and our template
+    if container != -1:
+        edits.append((container, container + len(_PYVIS_CONTAINER), heading + _load_html_template()))
+    
+    # Stream the page out piece by piece instead of building modified full-size copies
+    edits.sort()
+    _write_html(output_file, _splice(html, edits))
+
+def _splice(text, edits):
+    """Yield text with sorted, non-overlapping (start, end, replacement) edits applied, piece by piece."""
+    position = 0
+    for start, end, replacement in edits:
+        yield text[position:start]
+        yield replacement
+        position = end
+    yield text[position:]
+
+def _write_direct_html(output_file, vis_nodes, vis_edges, options_json, title):
+    """
+    Write the page without PyVis: the node and edge lists are serialized straight into a
+    vis-network script placed right after the template's graph container.
     
-    # Add our custom controls by replacing the div with our template
-    html = html.replace('<div id="mynetwork" class="card-body"></div>', _load_html_template())
+    Args:
+        output_file: Path of the HTML file to write
+        vis_nodes: List of (node_id, attributes) tuples
+        vis_edges: List of (source, target, attributes) tuples
+        options_json: vis-network options as a JSON string
+        title: Page heading
+    """
+    nodes_json = _to_script_json([{"id": node, **options} for node, options in vis_nodes])
+    edges_json = _to_script_json([{"from": source, "to": target, **options} for source, target, options in vis_edges])
+    script = (
+        '<script type="text/javascript">\n'
+        f'var nodes = new vis.DataSet({nodes_json});\n'
+        f'var edges = new vis.DataSet({edges_json});\n'
+        'var container = document.getElementById("mynetwork");\n'
+        f'var network = new vis.Network(container, {{nodes: nodes, edges: edges}}, {options_json});\n'
+        '</script>'
+    )
     
-    # Fix the duplicate title issue
-    # Remove the default PyVis header
-    html = re.sub(r'<center>\s*<h1>.*?</h1>\s*</center>', '', html)
+    # Draw the network right after its container so the template's own scripts can use it
+    body, found = _NETWORK_CONTAINER.subn(lambda match: match.group(0) + script, _load_html_template(), count=1)
+    if not found:
+        body += script
     
-    # Replace the other h1 with our enhanced title
-    html = html.replace('<h1></h1>', f'<h1>Knowledge Graph - {len(all_nodes)} Nodes, {len(triples)} Relationships, {community_count} Communities</h1>')
+    # Inline vis-network like the PyVis path (cdn_resources='in_line') so the page also works offline
+    assets = _load_vis_network_assets()
+    if assets is not None:
+        vis_network = ('<style type="text/css">\n', assets[1], '\n</style>\n'
+                       '<script type="text/javascript">\n', assets[0], '\n</script>\n')
+    else:
+        vis_network = (f'<link rel="stylesheet" href="{_VIS_NETWORK_CSS}" type="text/css" />\n'
+                       f'<script type="text/javascript" src="{_VIS_NETWORK_JS}"></script>\n',)
     
-    # Write the HTML directly to the output file with explicit UTF-8 encoding
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+    _write_html(output_file, (
+        '<html>\n<head>\n<meta charset="utf-8">\n'
+        f'<title>{escape(title)}</title>\n',
+        *vis_network,
+        f'<link rel="stylesheet" href="{_BOOTSTRAP_CSS}" />\n'
+        '</head>\n<body>\n'
+        f'<h1>{escape(title)}</h1>\n',
+        body,
+        '\n</body>\n</html>\n'
+    ))
+
+def _to_json(data, indent=False):
+    """Serialize data as JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, indent=2 if indent else None)
+
+def _to_script_json(data):
+    """Serialize data as JSON that is safe to embed in a <script> element."""
+    return _to_json(data).replace('</', '<\\/')
+
+def _write_html(output_file, parts):
+    """Write the HTML, given as an iterable of consecutive string parts, with explicit UTF-8 encoding."""
+    # Move it into place afterwards so an interrupted run never leaves a truncated file behind
+    temp_file = f"{output_file}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.writelines(parts)
+    os.replace(temp_file, output_file)
     
     print(f"Knowledge graph visualization saved to {output_file}")
 
@@ -355,6 +854,9 @@ def sample_data_visualization(output_file="sample_knowledge_graph.html", edge_sm
                     false, "dynamic", "continuous", "discrete", "diagonalCross", 
                     "straightCross", "horizontal", "vertical", "curvedCW", "curvedCCW", "cubicBezier"
         config: Configuration dictionary (optional)
+        
+    Returns:
+        Dictionary with graph statistics (see visualize_knowledge_graph)
     """
     # Sample data representing knowledge graph triples
     sample_triples = [
@@ -382,10 +884,7 @@ def sample_data_visualization(output_file="sample_knowledge_graph.html", edge_sm
     ]
     
     # Determine edge smoothing from config if not explicitly provided
-    if edge_smooth is None and config is not None:
-        edge_smooth = config.get("visualization", {}).get("edge_smooth", False)
-    elif edge_smooth is None:
-        edge_smooth = False
+    edge_smooth = VizConfig.from_dict(config, edge_smooth).edge_smooth
     
     # Generate the visualization
     print(f"Generating sample visualization with {len(sample_triples)} triples")
@@ -408,6 +907,7 @@ def sample_data_visualization(output_file="sample_knowledge_graph.html", edge_sm
     
     print(f"\nVisualization saved to {output_file}")
     print(f"To view, open: file://{os.path.abspath(output_file)}") 
+    return stats
 
 if __name__ == "__main__":
     # Run sample visualization when this module is run directly
@@ -439,7 +939,7 @@ if __name__ == "__main__":
     sample_data_visualization("sample_knowledge_graph_config.html", config=config)
     
     # Determine edge style from config for output message
-    config_edge_type = config.get("visualization", {}).get("edge_smooth", False)
+    config_edge_type = VizConfig.from_dict(config).edge_smooth
     if config_edge_type is False:
         config_description = "straight edges (no smoothing)"
     else:
@@ -503,13 +1003,15 @@ def _apply_community_colors(G):
     except ImportError:
         print("Note: community detection package not found. Using default colors.")
 
-def _get_adaptive_physics_settings(nodes_count, edges_count):
+def _get_adaptive_physics_settings(nodes_count, edges_count, positioned=False):
     """
     Returns optimized physics settings based on network size.
     
     Args:
         nodes_count (int): Number of nodes in the network
         edges_count (int): Number of edges in the network
+        positioned (bool): Whether the nodes carry precomputed positions; physics is
+            then disabled so the browser draws them without a simulation
         
     Returns:
         dict: Physics configuration options
@@ -557,4 +1059,9 @@ def _get_adaptive_physics_settings(nodes_count, edges_count):
         else:
             settings["barnesHut"]["springLength"] *= 1.5
     
+    # Large graphs with precomputed positions: skip the (slow) in-browser simulation
+    if positioned:
+        settings["enabled"] = False
+        settings["stabilization"]["enabled"] = False
+    
     return settings
\ No newline at end of file
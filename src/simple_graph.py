@@ -1,11 +1,16 @@
 """知识图谱生成工具"""
 import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from knowledge_graph.config import load_config
 from knowledge_graph.text_utils import chunk_text
 from knowledge_graph.llm import call_llm
 from knowledge_graph.visualization import visualize_knowledge_graph
 
+# "主体 - 关系 - 客体"：恰好含两个 " - " 分隔符的行（与 line.split(' - ') 得到三段等价）
+_TRIPLE_RE = re.compile(r'^((?:(?! - ).)*) - ((?:(?! - ).)*) - ((?:(?! - ).)*)$', re.MULTILINE)
+
 def analyze_text(text, title="知识图谱", debug=False):
     """分析文本并生成知识图谱"""
     # 加载配置
@@ -17,12 +22,12 @@ def analyze_text(text, title="知识图谱", debug=False):
     
     print(f"开始处理{len(chunks)}个文本块...")
     
-    # 处理每个文本块
-    for i, chunk in enumerate(chunks):
+    def process_chunk(item):
+        i, chunk = item
         print(f"处理第{i+1}个文本块...")
         
         # 调用LLM处理
-        response = call_llm(
+        return call_llm(
             model=config["llm"]["model"],
             user_prompt=chunk,
             api_key=config["llm"]["api_key"],
@@ -31,20 +36,22 @@ def analyze_text(text, title="知识图谱", debug=False):
             temperature=1.0,
             base_url=config["llm"]["base_url"]
         )
-        
+    
+    # 并发处理所有文本块（最多 llm.concurrency 个请求同时进行），结果保持原顺序
+    workers = max(1, config.get("llm", {}).get("concurrency", 8))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        responses = list(executor.map(process_chunk, enumerate(chunks)))
+    
+    for response in responses:
         if response:
             # 简单解析响应
-            lines = response.split('\n')
-            for line in lines:
-                if ' - ' in line:
-                    parts = line.split(' - ')
-                    if len(parts) == 3:
-                        triple = {
-                            'subject': parts[0].strip(),
-                            'predicate': parts[1].strip(),
-                            'object': parts[2].strip()
-                        }
-                        all_triples.append(triple)
+            for match in _TRIPLE_RE.finditer(response):
+                subject, predicate, obj = match.groups()
+                all_triples.append({
+                    'subject': subject.strip(),
+                    'predicate': predicate.strip(),
+                    'object': obj.strip()
+                })
     
     if all_triples:
         # 生成可视化
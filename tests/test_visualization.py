@@ -0,0 +1,55 @@
+"""Tests for the knowledge graph visualization."""
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("networkx")
+pytest.importorskip("pyvis")
+
+import networkx as nx
+
+from src.knowledge_graph.visualization import (
+    DIRECT_HTML_THRESHOLD,
+    MAX_RENDERED_NODES,
+    _VIS_NETWORK_JS,
+    _parallel_betweenness,
+    sample_data_visualization,
+    visualize_knowledge_graph,
+)
+
+
+def _star(leaves):
+    """Triples linking one hub to the given number of leaves."""
+    return [{"subject": "hub", "predicate": "links", "object": f"leaf {i}"} for i in range(leaves)]
+
+
+def test_pruned_graph_shows_banner(tmp_path):
+    output = tmp_path / "graph.html"
+    stats = visualize_knowledge_graph(_star(30), str(output), config={"visualization": {"max_nodes": 10}})
+
+    html = output.read_text(encoding="utf-8")
+    assert "Top 10 of 31 Nodes" in html
+    assert stats["nodes"] == 31
+
+
+def test_sample_graph_keeps_community_colors(tmp_path):
+    stats = sample_data_visualization(str(tmp_path / "sample.html"))
+    assert stats["communities"] > 1
+
+
+def test_large_graph_uses_direct_writer_by_default(tmp_path):
+    assert DIRECT_HTML_THRESHOLD < MAX_RENDERED_NODES
+    output = tmp_path / "graph.html"
+    visualize_knowledge_graph(_star(DIRECT_HTML_THRESHOLD + 10), str(output))
+
+    html = output.read_text(encoding="utf-8")
+    assert "new vis.DataSet(" in html
+    # vis-network is inlined, so the page also works offline
+    assert _VIS_NETWORK_JS not in html
+
+
+@pytest.mark.parametrize("k", [None, 40])
+def test_parallel_betweenness_matches_networkx(k):
+    G = nx.gnm_random_graph(120, 300, seed=1)
+
+    expected = nx.betweenness_centrality(G, k=k, seed=42)
+    assert _parallel_betweenness(G, k) == pytest.approx(expected)